@@ -1,7 +1,7 @@
 import os
 from flask import Flask, jsonify
 from app.config import get_config
-from .extensions import db, migrate, cors, mail, login
+from .extensions import db, migrate, cors, mail, login, search_cache, timetable, stop_index, catalog, stop_locator, search_analytics, cache_warmer, booking_sweeper, idempotency, ticket_cache
 from paychangu import PayChanguClient
 
 def create_app(config_name: str = None) -> Flask:
@@ -48,13 +48,24 @@ def initialize_extensions(app: Flask):
             r"/api/*": {
                 "origins": app.config['CORS_ORIGINS'],
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-                "allow_headers": ["Content-Type", "Authorization"],
+                "allow_headers": ["Content-Type", "Authorization", "Idempotency-Key"],
+                "expose_headers": ["Idempotent-Replayed"],
                 "supports_credentials": True
             }
         }
     )
     login.init_app(app)
     mail.init_app(app)
+    search_cache.init_app(app)
+    timetable.init_app(app)
+    stop_index.init_app(app)
+    catalog.init_app(app)
+    stop_locator.init_app(app)
+    search_analytics.init_app(app)
+    cache_warmer.init_app(app)
+    booking_sweeper.init_app(app)
+    idempotency.init_app(app)
+    ticket_cache.init_app(app)
 
 
 def initialize_paychangu(app: Flask):
@@ -1,10 +1,25 @@
+import io
+import json
+import base64
+import binascii
+import secrets
 from app import db
+from flask import current_app
+from sqlalchemy import insert, update, case, and_, or_
 from datetime import datetime, timezone, timedelta
 from ..utils.payments import create_payment_link
-from app.models import Bookings, Schedules, Users
+from ..extensions import booking_sweeper, ticket_cache
+from app.models import Bookings, Schedules, Users, Routes, Buses, BusCompanies, CANCELLATION_WINDOW
 from flask_login import current_user
 from flask import Blueprint, request, jsonify, abort, send_file
-from ..utils.qr_generator import generate_qr_code_image, parse_qr_reference
+from ..utils.qr_generator import parse_qr_reference
+from ..utils.ticket_cache import ticket_info
+from ..utils.idempotency import idempotent
+from ..utils.columnar import wants_columnar, to_columnar
+from ..utils.seat_inventory import (
+    allocate_seats, release_seats, release_expired_holds, has_inventory, take_seats, take_seats_locked,
+    adjust_seat_count, SeatUnavailableError
+)
 from .auth import passenger_required, passenger_or_admin_required, conductor_required, admin_required
 
 
@@ -12,6 +27,7 @@ bookings_bp = Blueprint('bookings', __name__)
 
 @bookings_bp.route('/book', methods=["POST"])
 @passenger_required
+@idempotent
 def book_a_seat():
     """ book a seat """
     data = request.get_json()
@@ -22,11 +38,15 @@ def book_a_seat():
     if not schedule_id:
         abort(400, description="Missing required booking information.")
     
-    # Use with_for_update() to lock the schedule row during transaction
-    schedule = db.session.query(Schedules).filter_by(id=schedule_id).with_for_update().first()
+    schedule = db.session.get(Schedules, schedule_id)
     if not schedule:
         abort(400, description='invalid schedule_id')
 
+    # Give back seats whose payment window ran out (this may also cancel the
+    # user's own expired pending booking below)
+    if release_expired_holds(schedule.id):
+        db.session.commit()
+
     if schedule.available_seats <= 0:
         abort(400, description="No available seats for this schedule.")
 
@@ -50,29 +70,39 @@ def book_a_seat():
     booking = Bookings(
         schedule_id=schedule_id,
         user_id=current_user.id,
-        seat_number=seat_number,
         status='pending'
     )
-    
-    # Reserve seat temporarily
-    schedule.available_seats -= 1
+    hold_until = datetime.now(timezone.utc) + timedelta(minutes=current_app.config['SEAT_HOLD_MINUTES'])
+    amount = schedule.price
+    user_email = current_user.email
+    user_name = current_user.name
 
+    # One short transaction: hold the seat until hold_until and commit
     try:
         db.session.add(booking)
-        db.session.commit()
-        
-        # Generate QR code reference
+        db.session.flush()
+        booking.seat_number = _reserve_seat(schedule, booking, seat_number, hold_until)
         booking.generate_qr_reference()
+        booking_id = booking.id
         db.session.commit()
-        
-        # Create payment link after booking is saved
-        payment_result = create_payment_link(
-            booking_id=booking.id,
-            amount=schedule.price,
-            user_email=current_user.email,
-            user_name=current_user.name
-        )
-        
+    except SeatUnavailableError as e:
+        db.session.rollback()
+        abort(400, description=str(e))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    # The payment gateway is called with no transaction open and no rows locked;
+    # if the user never pays, the hold expires and the seat goes back
+    payment_result = create_payment_link(
+        booking_id=booking_id,
+        amount=amount,
+        user_email=user_email,
+        user_name=user_name
+    )
+
+    try:
+        booking = db.session.get(Bookings, booking_id)
         if payment_result.get('status') == 'success':
             booking.payment_link = payment_result['checkout_url']
             booking.tx_ref = payment_result['tx_ref']
@@ -82,57 +112,244 @@ def book_a_seat():
                 "message": "Booking created successfully",
                 "booking": booking.to_dict(),
                 "payment_link": booking.payment_link,
-                "tx_ref": booking.tx_ref
+                "tx_ref": booking.tx_ref,
+                "hold_expires_at": hold_until.isoformat()
             }), 201
-        else:
-            # Rollback booking if payment link creation fails
-            schedule.available_seats += 1
-            db.session.delete(booking)
-            db.session.commit()
-            
-            return jsonify({
-                "error": "Failed to create payment link",
-                "details": payment_result.get('error')
-            }), 500
+
+        # Rollback booking if payment link creation fails (unless its hold
+        # already expired and the seat was given back)
+        if booking.status == 'pending':
+            release_seats([booking_id])
+            adjust_seat_count(booking.schedule, 1)
+        db.session.delete(booking)
+        db.session.commit()
+        
+        return jsonify({
+            "error": "Failed to create payment link",
+            "details": payment_result.get('error')
+        }), 500
             
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
-@bookings_bp.route('/cleanup-abandoned', methods=['POST'])
-@admin_required
-def cleanup_abandoned_bookings():
-    """
-    Admin endpoint to clean up abandoned pending bookings.
-    Bookings pending for more than 1 hour are cancelled and seats restored.
+def _reserve_seat(schedule, booking, seat_number=None, hold_until=None):
     """
-    cutoff_time = datetime.now(timezone.utc) - timedelta(hours=1)
+    Take a seat on schedule for a flushed booking and decrement the seat counter.
     
-    abandoned_bookings = Bookings.query.filter(
-        Bookings.status == 'pending',
-        Bookings.created_at < cutoff_time
-    ).all()
+    With the "inventory" strategy a row is claimed from the seat inventory, so
+    concurrent bookings don't wait on each other; with hold_until the seat is
+    only held until then. The "counter" strategy, and schedules without an
+    inventory, only decrement the counter with one conditional UPDATE; the
+    "locked" strategy locks the schedule row and decrements it instead.
     
-    count = 0
-    for booking in abandoned_bookings:
-        booking.status = 'cancelled'
-        booking.schedule.available_seats += 1
-        count += 1
+    Returns:
+        str: The seat number (the requested one when only the counter is used)
     
+    Raises:
+        SeatUnavailableError: If no seat (or not the requested seat) is free
+    """
+    if current_app.config['BOOKING_SEAT_STRATEGY'] == 'inventory':
+        try:
+            seat = allocate_seats(schedule.id, [booking.id], seat_number, hold_until)[0]
+        except SeatUnavailableError:
+            if has_inventory(schedule.id):
+                raise
+        else:
+            # Relative update: no read-modify-write on the shared counter
+            adjust_seat_count(schedule, -1)
+            return seat
+    
+    if not _take_counter_seats(schedule, 1):
+        raise SeatUnavailableError('No available seats for this schedule.')
+    return seat_number
+
+
+@bookings_bp.route('/book-group', methods=["POST"])
+@passenger_required
+@idempotent
+def book_group():
+    """
+    Book several seats on one schedule, paid with a single payment link.
+    
+    Body: schedule_id, passengers (number of seats)
+    """
+    data = request.get_json() or {}
+
+    schedule_id = data.get('schedule_id')
+    passengers = data.get('passengers')
+
+    if not schedule_id or passengers is None:
+        abort(400, description="Missing required booking information.")
+
+    max_seats = current_app.config['GROUP_BOOKING_MAX_SEATS']
+    if not isinstance(passengers, int) or isinstance(passengers, bool) or not 1 <= passengers <= max_seats:
+        abort(400, description=f'passengers must be a whole number between 1 and {max_seats}')
+
+    schedule = db.session.get(Schedules, schedule_id)
+    if not schedule:
+        abort(400, description='invalid schedule_id')
+
+    if release_expired_holds(schedule.id):
+        db.session.commit()
+
+    if schedule.available_seats < passengers:
+        abort(400, description="Not enough available seats for this schedule.")
+
+    group_reference = f"GRP-{secrets.token_hex(8)}"
+    hold_until = datetime.now(timezone.utc) + timedelta(minutes=current_app.config['SEAT_HOLD_MINUTES'])
+    amount = schedule.price * passengers
+    user_email = current_user.email
+    user_name = current_user.name
+
+    # One short transaction: insert the bookings, hold their seats, commit
+    try:
+        booking_ids = list(db.session.scalars(
+            insert(Bookings).returning(Bookings.id, sort_by_parameter_order=True),
+            [
+                {
+                    'schedule_id': schedule.id,
+                    'user_id': current_user.id,
+                    'status': 'pending',
+                    'group_reference': group_reference
+                }
+                for _ in range(passengers)
+            ]
+        ))
+        seat_numbers = _reserve_group_seats(schedule, booking_ids, hold_until)
+
+        # Seat numbers and QR references for the whole group in one statement
+        db.session.execute(
+            update(Bookings)
+            .where(Bookings.id.in_(booking_ids))
+            .values(
+                seat_number=case(dict(zip(booking_ids, seat_numbers)), value=Bookings.id),
+                qr_code_reference=case(
+                    {booking_id: Bookings.make_qr_reference(booking_id) for booking_id in booking_ids},
+                    value=Bookings.id
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except SeatUnavailableError as e:
+        db.session.rollback()
+        abort(400, description=str(e))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    # The payment is keyed on the first booking; payments settle the whole group
+    payment_result = create_payment_link(
+        booking_id=booking_ids[0],
+        amount=amount,
+        user_email=user_email,
+        user_name=user_name
+    )
+
     try:
+        if payment_result.get('status') == 'success':
+            db.session.execute(
+                update(Bookings)
+                .where(Bookings.id.in_(booking_ids))
+                .values(
+                    payment_link=payment_result['checkout_url'],
+                    tx_ref=case({booking_ids[0]: payment_result['tx_ref']}, value=Bookings.id)
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+            bookings = Bookings.query.filter(Bookings.id.in_(booking_ids)).order_by(Bookings.id).all()
+            return jsonify({
+                "message": "Group booking created successfully",
+                "group_reference": group_reference,
+                "bookings": [booking.to_dict() for booking in bookings],
+                "total_amount": amount,
+                "payment_link": payment_result['checkout_url'],
+                "tx_ref": payment_result['tx_ref'],
+                "hold_expires_at": hold_until.isoformat()
+            }), 201
+
+        # Rollback the group if payment link creation fails (seats whose hold
+        # already expired were given back)
+        pending_ids = [
+            booking_id for booking_id, in db.session.query(Bookings.id).filter(
+                Bookings.id.in_(booking_ids), Bookings.status == 'pending'
+            )
+        ]
+        if pending_ids:
+            release_seats(pending_ids)
+            adjust_seat_count(db.session.get(Schedules, schedule_id), len(pending_ids))
+        db.session.execute(Bookings.__table__.delete().where(Bookings.id.in_(booking_ids)))
         db.session.commit()
+
         return jsonify({
-            "message": f"Cleaned up {count} abandoned bookings",
-            "count": count
-        }), 200
+            "error": "Failed to create payment link",
+            "details": payment_result.get('error')
+        }), 500
+
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
+def _reserve_group_seats(schedule, booking_ids, hold_until):
+    """
+    Hold one seat per booking with a single inventory update and decrement the
+    seat counter by the group size. Like _reserve_seat, the "counter" and
+    "locked" strategies and legacy schedules only take the seats off the counter.
+    
+    Returns:
+        list: Seat numbers in booking_ids order (None when only the counter is used)
+    """
+    count = len(booking_ids)
+    if current_app.config['BOOKING_SEAT_STRATEGY'] == 'inventory':
+        try:
+            seats = allocate_seats(schedule.id, booking_ids, hold_until=hold_until)
+        except SeatUnavailableError:
+            if has_inventory(schedule.id):
+                raise
+        else:
+            adjust_seat_count(schedule, -count)
+            return seats
+
+    if not _take_counter_seats(schedule, count):
+        raise SeatUnavailableError('Not enough available seats for this schedule.')
+    return [None] * count
+
+
+def _take_counter_seats(schedule, count):
+    if current_app.config['BOOKING_SEAT_STRATEGY'] == 'locked':
+        return take_seats_locked(schedule, count)
+    return take_seats(schedule.id, count)
+
+
+@bookings_bp.route('/cleanup-abandoned', methods=['POST'])
+@admin_required
+def cleanup_abandoned_bookings():
+    """
+    Admin endpoint to clean up abandoned pending bookings right away.
+    Expired seat holds are released and bookings pending for longer than
+    BOOKING_ABANDON_MINUTES are cancelled, with their seats restored.
+    """
+    try:
+        stats = booking_sweeper.sweep()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    count = stats['holds_released'] + stats['bookings_abandoned']
+    return jsonify({
+        "message": f"Cleaned up {count} abandoned bookings",
+        "count": count,
+        **stats
+    }), 200
+
+
 @bookings_bp.route('/cancel/<int:booking_id>', methods=["POST"])
 @passenger_required
+@idempotent
 def cancel_booking(booking_id: int):
     """ Cancel a booking """
 
@@ -147,8 +364,9 @@ def cancel_booking(booking_id: int):
         return abort(400, description='cancellation window has passed')
 
     booking.status = 'cancelled'
-    booking.schedule.available_seats += 1
+    adjust_seat_count(booking.schedule, 1)
     booking.cancelled_at = datetime.now(timezone.utc)
+    release_seats([booking.id])
 
     try:
         db.session.commit()
@@ -183,6 +401,150 @@ def get_bookings():
     return jsonify({"bookings": [booking.to_dict() for booking in bookings]}), 200
 
 
+TRIP_WINDOWS = ('upcoming', 'past')
+
+
+@bookings_bp.route('/trips', methods=["GET"])
+@passenger_required
+def get_trips():
+    """
+    The passenger's trips with everything a trip card shows, in one query.
+    
+    Query params:
+        status: Booking status(es), comma separated (e.g. confirmed,pending)
+        when: upcoming (departing from now on, soonest first) or past
+              (most recent first); default all trips, most recent first
+        limit: Page size (default DEFAULT_PAGE_SIZE, at most MAX_PAGE_SIZE)
+        after: next_cursor of the previous page
+        format: json (default) or columnar
+    """
+    statuses = [status.strip().lower() for status in request.args.get('status', '').split(',') if status.strip()]
+    when = request.args.get('when', '').strip().lower() or None
+    if when is not None and when not in TRIP_WINDOWS:
+        abort(400, description=f'when must be one of: {", ".join(TRIP_WINDOWS)}')
+
+    limit = request.args.get('limit', current_app.config['DEFAULT_PAGE_SIZE'], type=int)
+    if limit is None or limit < 1:
+        abort(400, description='limit must be a positive integer')
+    limit = min(limit, current_app.config['MAX_PAGE_SIZE'])
+    columnar = wants_columnar()
+
+    # Soonest first for upcoming trips, most recent first otherwise
+    ascending = when == 'upcoming'
+    query = db.session.query(
+        Bookings.id, Bookings.status, Bookings.seat_number, Bookings.qr_code_reference,
+        Bookings.qr_code_reference_status, Bookings.payment_link, Bookings.tx_ref,
+        Bookings.group_reference, Bookings.created_at,
+        Schedules.id.label('schedule_id'), Schedules.departure_time, Schedules.arrival_time, Schedules.price,
+        Routes.id.label('route_id'), Routes.origin, Routes.destination,
+        Buses.id.label('bus_id'), Buses.name.label('bus_name'), Buses.bus_number,
+        BusCompanies.id.label('company_id'), BusCompanies.name.label('company_name')
+    ).select_from(Bookings).join(
+        Schedules, Schedules.id == Bookings.schedule_id
+    ).join(
+        Routes, Routes.id == Schedules.route_id
+    ).join(
+        Buses, Buses.id == Schedules.bus_id
+    ).join(
+        BusCompanies, BusCompanies.id == Buses.company_id
+    ).filter(Bookings.user_id == current_user.id)
+
+    if statuses:
+        query = query.filter(Bookings.status.in_(statuses))
+
+    now = datetime.now(timezone.utc)
+    if when == 'upcoming':
+        query = query.filter(Schedules.departure_time >= now)
+    elif when == 'past':
+        query = query.filter(Schedules.departure_time < now)
+
+    after = request.args.get('after')
+    if after:
+        try:
+            departure_time, booking_id = _decode_trip_cursor(after)
+        except ValueError:
+            abort(400, description='Invalid after cursor')
+        if ascending:
+            beyond = or_(
+                Schedules.departure_time > departure_time,
+                and_(Schedules.departure_time == departure_time, Bookings.id > booking_id)
+            )
+        else:
+            beyond = or_(
+                Schedules.departure_time < departure_time,
+                and_(Schedules.departure_time == departure_time, Bookings.id < booking_id)
+            )
+        query = query.filter(beyond)
+
+    if ascending:
+        query = query.order_by(Schedules.departure_time, Bookings.id)
+    else:
+        query = query.order_by(Schedules.departure_time.desc(), Bookings.id.desc())
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = _encode_trip_cursor(rows[limit - 1]) if len(rows) > limit else None
+    trips = [_trip_result(row, now) for row in rows[:limit]]
+
+    if columnar:
+        return jsonify(to_columnar(trips, next_cursor=next_cursor)), 200
+    return jsonify({"count": len(trips), "trips": trips, "next_cursor": next_cursor}), 200
+
+
+def _trip_result(row, now):
+    """Format a projected trips row (see get_trips) as a trip card."""
+    departure_time = row.departure_time
+    if departure_time.tzinfo is None:
+        departure_time = departure_time.replace(tzinfo=timezone.utc)
+
+    return {
+        'booking_id': row.id,
+        'status': row.status,
+        'seat_number': row.seat_number,
+        'qr_code_reference': row.qr_code_reference,
+        'qr_code_status': row.qr_code_reference_status,
+        # Only useful while the booking is still waiting for payment
+        'payment_link': row.payment_link if row.status == 'pending' else None,
+        'tx_ref': row.tx_ref,
+        'group_reference': row.group_reference,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'can_cancel': row.status == 'confirmed' and now < departure_time - CANCELLATION_WINDOW,
+        'schedule_id': row.schedule_id,
+        'departure_time': row.departure_time.isoformat(),
+        'arrival_time': row.arrival_time.isoformat(),
+        'price': row.price,
+        'route': {
+            'id': row.route_id,
+            'origin': row.origin,
+            'destination': row.destination
+        },
+        'bus': {
+            'id': row.bus_id,
+            'name': row.bus_name,
+            'bus_number': row.bus_number
+        },
+        'company': {
+            'id': row.company_id,
+            'name': row.company_name
+        }
+    }
+
+
+def _encode_trip_cursor(row):
+    values = [row.departure_time.isoformat(), row.id]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def _decode_trip_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != 2:
+            raise ValueError('Invalid cursor')
+        return datetime.fromisoformat(values[0]), int(values[1])
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+
+
 @bookings_bp.route('/get/<int:booking_id>', methods=["GET"])
 @passenger_or_admin_required
 def get_booking(booking_id: int):
@@ -230,15 +592,11 @@ def download_qr_code(booking_id: int):
     schedule = booking.schedule
     route = schedule.route
     
-    booking_info = {
-        'booking_id': booking.id,
-        'route': f"{route.origin} to {route.destination}",
-        'departure_date': schedule.departure_time.strftime('%Y-%m-%d %H:%M')
-    }
+    booking_info = ticket_info(booking.id, route.origin, route.destination, schedule.departure_time)
     
-    # Generate QR code image
+    # Rendered once per ticket, then served from the ticket cache
     try:
-        qr_image = generate_qr_code_image(booking.qr_code_reference, booking_info)
+        qr_image = io.BytesIO(ticket_cache.get(booking.qr_code_reference, booking_info))
         
         # Return as downloadable file
         return send_file(
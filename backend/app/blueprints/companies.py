@@ -3,6 +3,7 @@ from app.models import BusCompanies, Users, Branches
 from flask_login import current_user
 from sqlalchemy.exc import IntegrityError
 from flask import Blueprint, request, jsonify, abort, current_app
+from ..extensions import catalog
 from ..utils.paychangu_payouts import get_available_banks
 from .auth import admin_required, company_owner_or_admin_required
 
@@ -231,13 +232,13 @@ def register_bus_company():
 @companies_bp.route('/get', methods=["GET"])
 def get_companies():
     """Get all registered bus companies"""
-    companies = BusCompanies.query.filter_by(status='registered').all()
+    companies = catalog.companies()
 
     if not companies:
         return jsonify({"message": "No registered bus companies", "companies": []}), 200
     
     return jsonify({
-        "companies": [company.to_dict() for company in companies],
+        "companies": companies,
         "count": len(companies)
     }), 200
 
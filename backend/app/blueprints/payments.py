@@ -1,11 +1,56 @@
 from app import db
 from ..utils.payments import verify_payment
+from ..utils.seat_inventory import (
+    allocate_seats, release_seats, confirm_seats, has_inventory, adjust_seat_count, SeatUnavailableError
+)
 from app.models import Bookings, Transactions
+from ..extensions import ticket_cache
 from flask import Blueprint, jsonify, request, abort, current_app
 
 payments_bp = Blueprint('payments', __name__)
 
 
+def _payment_bookings(booking):
+    """All bookings paid for by booking's tx_ref: its whole group, or just itself."""
+    if not booking.group_reference:
+        return [booking]
+    return Bookings.query.filter_by(group_reference=booking.group_reference).order_by(Bookings.id).all()
+
+
+def _secure_seats(bookings):
+    """
+    Turn paid bookings' seat holds into booked seats.
+    
+    If a hold expired before the payment came in, the seat was given back
+    (and the booking cancelled); take a free seat again if there is one.
+    """
+    schedule = bookings[0].schedule
+    lost = confirm_seats([booking.id for booking in bookings])
+    # The counter strategy never gives bookings a seat row to lose
+    if not lost or current_app.config['BOOKING_SEAT_STRATEGY'] != 'inventory' or not has_inventory(schedule.id):
+        return
+    lost = [booking for booking in bookings if booking.id in lost]
+    try:
+        seats = allocate_seats(schedule.id, [booking.id for booking in lost])
+    except SeatUnavailableError:
+        current_app.logger.error(
+            f"Bookings {[booking.id for booking in lost]} were paid after their seat holds expired "
+            f"and the schedule is full; refund needed"
+        )
+        return
+    for booking, seat in zip(lost, seats):
+        booking.seat_number = seat
+    adjust_seat_count(schedule, -len(lost))
+
+
+def _release_unpaid(bookings):
+    """Give back the seats of bookings whose payment failed (expired holds already were)."""
+    pending = [booking for booking in bookings if booking.status == 'pending']
+    if pending:
+        release_seats([booking.id for booking in pending])
+        adjust_seat_count(pending[0].schedule, len(pending))
+
+
 @payments_bp.route('/callback', methods=['POST', 'GET'])
 def payment_callback():
     """
@@ -31,18 +76,23 @@ def payment_callback():
         if not booking:
             abort(404, description='Booking not found')
         
+        bookings = _payment_bookings(booking)
+        amount = booking.schedule.price * len(bookings)
+        
         # Verify payment with PayChangu
         verification = verify_payment(tx_ref)
         
         # Update booking status based on payment status
         if verification.get('status') == 'success' or status == 'success':
-            booking.status = 'confirmed'
+            _secure_seats(bookings)
+            for paid in bookings:
+                paid.status = 'confirmed'
             
             # Create or update transaction record
             transaction = Transactions.query.filter_by(reference=tx_ref).first()
             if not transaction:
                 transaction = Transactions(
-                    amount=booking.schedule.price,
+                    amount=amount,
                     status='completed',
                     method='paychangu',
                     reference=tx_ref,
@@ -54,14 +104,15 @@ def payment_callback():
                 transaction.status = 'completed'
                 transaction.payment_status = 'success'
             
-            # Update company balance (schedule.price - platform fee)
+            # Update company balance (schedule.price - platform fee, per seat)
             platform_fee = current_app.config.get('PLATFORM_FEE', 3000)
-            company_earnings = booking.schedule.price - platform_fee
+            company_earnings = (booking.schedule.price - platform_fee) * len(bookings)
             
             bus_company = booking.schedule.bus.company
             bus_company.balance += company_earnings
             
             db.session.commit()
+            ticket_cache.prerender([paid.id for paid in bookings])
             
             return jsonify({
                 "message": "Payment confirmed successfully",
@@ -74,7 +125,7 @@ def payment_callback():
             transaction = Transactions.query.filter_by(reference=tx_ref).first()
             if not transaction:
                 transaction = Transactions(
-                    amount=booking.schedule.price,
+                    amount=amount,
                     status='failed',
                     method='paychangu',
                     reference=tx_ref,
@@ -86,7 +137,10 @@ def payment_callback():
                 transaction.status = 'failed'
                 transaction.payment_status = 'failed'
             
-            booking.status = 'payment_failed'
+            # Restore available seats
+            _release_unpaid(bookings)
+            for unpaid in bookings:
+                unpaid.status = 'payment_failed'
             db.session.commit()
             
             return jsonify({
@@ -119,13 +173,18 @@ def payment_failed():
         
         booking = Bookings.query.filter_by(id=booking_id).first()
         if booking:
-            booking.status = 'payment_failed'
+            bookings = _payment_bookings(booking)
+            
+            # Restore available seats
+            _release_unpaid(bookings)
+            for unpaid in bookings:
+                unpaid.status = 'payment_failed'
             
             # Record failed transaction
             transaction = Transactions.query.filter_by(reference=tx_ref).first()
             if not transaction:
                 transaction = Transactions(
-                    amount=booking.schedule.price,
+                    amount=booking.schedule.price * len(bookings),
                     status='failed',
                     method='paychangu',
                     reference=tx_ref,
@@ -137,9 +196,6 @@ def payment_failed():
                 transaction.status = 'failed'
                 transaction.payment_status = 'failed'
             
-            # Restore available seat
-            booking.schedule.available_seats += 1
-            
             db.session.commit()
             
             return jsonify({
@@ -196,9 +252,13 @@ def payment_webhook():
         if not booking:
             abort(404, description='Booking not found')
         
+        bookings = _payment_bookings(booking)
+        
         # Update based on webhook data
         if status == 'success':
-            booking.status = 'confirmed'
+            _secure_seats(bookings)
+            for paid in bookings:
+                paid.status = 'confirmed'
             
             transaction = Transactions.query.filter_by(reference=tx_ref).first()
             if transaction:
@@ -207,12 +267,13 @@ def payment_webhook():
             
             # Update company balance
             platform_fee = current_app.config.get('PLATFORM_FEE', 3000)
-            company_earnings = booking.schedule.price - platform_fee
+            company_earnings = (booking.schedule.price - platform_fee) * len(bookings)
             booking.schedule.bus.company.balance += company_earnings
             
         elif status == 'failed':
-            booking.status = 'payment_failed'
-            booking.schedule.available_seats += 1
+            _release_unpaid(bookings)
+            for unpaid in bookings:
+                unpaid.status = 'payment_failed'
             
             transaction = Transactions.query.filter_by(reference=tx_ref).first()
             if transaction:
@@ -220,6 +281,8 @@ def payment_webhook():
                 transaction.payment_status = 'failed'
         
         db.session.commit()
+        if status == 'success':
+            ticket_cache.prerender([paid.id for paid in bookings])
         
         return jsonify({"message": "Webhook processed successfully"}), 200
         
@@ -4,6 +4,7 @@ from datetime import datetime, timezone
 from app.models import Payouts, BusCompanies
 from .auth import accounts_manager_required, admin_required
 from flask import request, jsonify, abort, Blueprint, current_app
+from ..utils.idempotency import idempotent
 from ..utils.paychangu_payouts import initiate_bank_payout, initiate_mobile_money_payout
 
 
@@ -12,6 +13,7 @@ payouts_bp = Blueprint('payouts', __name__)
 
 @payouts_bp.route('/request', methods=["POST"])
 @accounts_manager_required
+@idempotent
 def request_payout():
     """
     Request payout for company earnings.
@@ -22,8 +24,11 @@ def request_payout():
     if not data:
         abort(400, description='Data not provided')
     
-    amount = data.get('amount', type=float)
-    company_id = data.get('company_id', type=int)
+    try:
+        amount = float(data.get('amount') or 0)
+        company_id = int(data['company_id']) if data.get('company_id') else None
+    except (TypeError, ValueError):
+        abort(400, description='amount and company_id must be numbers')
     
     if not amount or amount <= 0:
         abort(400, description='Valid amount is required')
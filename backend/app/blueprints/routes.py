@@ -1,6 +1,7 @@
 from app import db
-from app.models import Routes
+from app.models import Routes, Stops
 from .auth import admin_required
+from ..extensions import catalog
 from flask import Blueprint, jsonify, request, abort
 
 
@@ -41,9 +42,58 @@ def create_route():
 def get_routes():
     """ Get all routes """
 
-    routes = Routes.query.all()
+    routes = catalog.routes()
     if routes == []:
         return jsonify({"message": "routes not found", "routes": []}), 200
 
-    return jsonify({"routes": [route.to_dict() for route in routes]}), 200
+    return jsonify({"routes": routes}), 200
 
+
+@routes_bp.route('/stops', methods=["POST"])
+@admin_required
+def save_stop():
+    """ Create a stop, or update its coordinates if it already exists """
+
+    data = request.get_json()
+    if not data:
+        abort(400, description='data not provided')
+
+    name = (data.get('name') or '').strip()
+    latitude = data.get('latitude')
+    longitude = data.get('longitude')
+
+    if not name or latitude is None or longitude is None:
+        abort(400, description='provide name, latitude and longitude')
+
+    try:
+        latitude = float(latitude)
+        longitude = float(longitude)
+    except (TypeError, ValueError):
+        abort(400, description='latitude and longitude must be numbers')
+
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        abort(400, description='latitude must be within [-90, 90] and longitude within [-180, 180]')
+
+    stop = Stops.query.filter(db.func.lower(Stops.name) == name.lower()).first()
+    created = stop is None
+    if created:
+        stop = Stops(name=name)
+        db.session.add(stop)
+    stop.latitude = latitude
+    stop.longitude = longitude
+
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        abort(500, description=str(e))
+
+    return jsonify({"message": "stop saved", "stop": stop.to_dict()}), 201 if created else 200
+
+
+@routes_bp.route('/stops', methods=["GET"])
+def get_stops():
+    """ Get all stops with coordinates """
+
+    stops = Stops.query.order_by(Stops.name).all()
+    return jsonify({"stops": [stop.to_dict() for stop in stops], "count": len(stops)}), 200
@@ -1,35 +1,20 @@
 from app import db
 from app.models import Schedules, Buses, Routes, BusCompanies
 from datetime import datetime, timezone
-from dateutil import parser as date_parser
 from .auth import schedule_manager_required, schedule_or_bus_manager_required
 from flask import Blueprint, jsonify, request, abort
 from flask_login import current_user
+from ..utils.local_time import parse_datetime_to_utc, parse_date_bound
+from ..utils.streaming import wants_ndjson, ndjson_response
+from ..utils.columnar import wants_columnar, to_columnar
+from ..utils.seat_inventory import create_seats, delete_seats
+from sqlalchemy.orm import joinedload
 
 schedules_bp = Blueprint('schedules', __name__)
 
-def parse_datetime_to_utc(datetime_string):
-    """
-    Parse datetime string to UTC timezone-aware datetime.
-    Accepts multiple formats:
-    - ISO 8601: "2024-03-15T14:30:00Z" or "2024-03-15T14:30:00+02:00"
-    - ISO without timezone: "2024-03-15T14:30:00" (assumes UTC)
-    - Date only: "2024-03-15" (assumes midnight UTC)
-    """
-    try:
-        # Use dateutil parser for flexible parsing
-        dt = date_parser.parse(datetime_string)
-        
-        # If naive (no timezone), assume UTC
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        else:
-            # Convert to UTC
-            dt = dt.astimezone(timezone.utc)
-        
-        return dt
-    except (ValueError, TypeError) as e:
-        raise ValueError(f"Invalid datetime format: {datetime_string}. Expected ISO 8601 format.") from e
+def _with_bus_and_route(query):
+    """Load bus and route in the same SELECT so streamed rows need no extra queries."""
+    return query.options(joinedload(Schedules.bus), joinedload(Schedules.route))
 
 
 @schedules_bp.route('/create', methods=["POST"])
@@ -133,6 +118,9 @@ def schedule_bus():
 
     try:
         db.session.add(schedule)
+        db.session.flush()
+        # One inventory row per seat, committed with the schedule
+        create_seats(schedule.id, available_seats)
         db.session.commit()
     except Exception as e:
         db.session.rollback()
@@ -154,7 +142,12 @@ def get_schedules():
     - from_date: ISO date string (e.g., "2024-03-15")
     - to_date: ISO date string (e.g., "2024-03-20")
     - route_id: Filter by specific route
+    - format: json (default) or columnar (compact, see utils/columnar.py)
+
+    Date-only values are local days; to_date includes the whole day.
+    Send "Accept: application/x-ndjson" to stream one schedule per line.
     """
+    columnar = wants_columnar()
     from_date_str = request.args.get('from_date')
     to_date_str = request.args.get('to_date')
     route_id = request.args.get('route_id', type=int)
@@ -164,15 +157,15 @@ def get_schedules():
     # Filter by date range if provided
     if from_date_str:
         try:
-            from_date = parse_datetime_to_utc(from_date_str)
+            from_date = parse_date_bound(from_date_str)
             query = query.filter(Schedules.departure_time >= from_date)
         except ValueError:
             abort(400, description='Invalid from_date format')
     
     if to_date_str:
         try:
-            to_date = parse_datetime_to_utc(to_date_str)
-            # Add one day to include the entire to_date
+            # Date-only to_date covers the entire local day
+            to_date = parse_date_bound(to_date_str, end=True)
             query = query.filter(Schedules.departure_time < to_date)
         except ValueError:
             abort(400, description='Invalid to_date format')
@@ -185,7 +178,16 @@ def get_schedules():
     if not from_date_str:
         query = query.filter(Schedules.departure_time > datetime.now(timezone.utc))
     
-    schedules = query.order_by(Schedules.departure_time.asc()).all()
+    query = query.order_by(Schedules.departure_time.asc())
+    
+    if wants_ndjson():
+        return ndjson_response(_with_bus_and_route(query), Schedules.to_dict)
+    
+    if columnar:
+        schedules = _with_bus_and_route(query).all()
+        return jsonify(to_columnar([schedule.to_dict() for schedule in schedules])), 200
+    
+    schedules = query.all()
     
     if not schedules:
         return jsonify({"message": "No schedules found", "schedules": []}), 200
@@ -213,6 +215,8 @@ def get_company_schedules():
     - from_date: ISO date string
     - to_date: ISO date string
     - branch_id: Filter by specific branch
+
+    Send "Accept: application/x-ndjson" to stream one schedule per line.
     """
     from_date_str = request.args.get('from_date')
     to_date_str = request.args.get('to_date')
@@ -238,22 +242,27 @@ def get_company_schedules():
     # Get all schedules for these buses
     query = Schedules.query.filter(Schedules.bus_id.in_(bus_ids))
     
-    # Apply date filters
+    # Apply date filters (date-only values are local days)
     if from_date_str:
         try:
-            from_date = parse_datetime_to_utc(from_date_str)
+            from_date = parse_date_bound(from_date_str)
             query = query.filter(Schedules.departure_time >= from_date)
         except ValueError:
             abort(400, description='Invalid from_date format')
     
     if to_date_str:
         try:
-            to_date = parse_datetime_to_utc(to_date_str)
+            to_date = parse_date_bound(to_date_str, end=True)
             query = query.filter(Schedules.departure_time < to_date)
         except ValueError:
             abort(400, description='Invalid to_date format')
     
-    schedules = query.order_by(Schedules.departure_time.desc()).all()
+    query = query.order_by(Schedules.departure_time.desc())
+    
+    if wants_ndjson():
+        return ndjson_response(_with_bus_and_route(query), Schedules.to_dict)
+    
+    schedules = query.all()
     
     return jsonify({
         "schedules": [schedule.to_dict() for schedule in schedules],
@@ -315,6 +324,9 @@ def update_schedule(schedule_id: int):
         if data['available_seats'] > bus.seating_capacity:
             abort(400, description='Available seats cannot exceed bus capacity')
         schedule.available_seats = data['available_seats']
+        # No bookings exist yet, so the inventory can simply be recreated
+        delete_seats(schedule.id)
+        create_seats(schedule.id, data['available_seats'])
     
     try:
         db.session.commit()
@@ -354,6 +366,7 @@ def cancel_schedule(schedule_id: int):
             # TODO: Process refunds here
     
     try:
+        delete_seats(schedule.id)
         db.session.delete(schedule)
         db.session.commit()
         
@@ -1,13 +1,43 @@
+import json
+import base64
+import binascii
 from app import db
-from datetime import datetime, timezone
-from sqlalchemy import and_, func
+from typing import NamedTuple
+from datetime import datetime, date, timezone, timedelta
+from sqlalchemy import and_, or_, case, cast, func, literal, literal_column, Integer
 from app.models import Schedules, Routes, Buses, BusCompanies
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, request, jsonify, abort, current_app
+from ..extensions import search_cache, timetable, stop_index, stop_locator, search_analytics, catalog
+from ..utils.location_index import location_match
+from ..utils.local_time import local_day_bounds, local_date_expr, local_timezone
+from ..utils.connections import find_itineraries
+from ..utils.timetable import stop_key
+from ..utils.streaming import wants_ndjson, ndjson_response
+from ..utils.columnar import wants_columnar, to_columnar
 
 
 search_bp = Blueprint('search', __name__)
 
 
+SORT_MODES = ('earliest', 'cheapest', 'fastest', 'most_seats')
+
+
+class ScheduleSearch(NamedTuple):
+    """Normalized schedule search parameters."""
+    origin: str
+    destination: str
+    travel_date: date = None
+    min_price: float = None
+    max_price: float = None
+    company_id: int = None
+    sort: str = 'earliest'
+    limit: int = None
+    after: str = None
+
+    def cache_key(self):
+        return search_cache.make_key('schedules', *self)
+
+
 @search_bp.route('/schedules', methods=['GET'])
 def search_schedules():
     """
@@ -16,10 +46,16 @@ def search_schedules():
     Query Parameters:
         - origin: Departure location
         - destination: Arrival location
-        - date: Travel date (YYYY-MM-DD)
+        - date: Travel date (YYYY-MM-DD, local day)
         - min_price: Minimum price filter (optional)
         - max_price: Maximum price filter (optional)
         - company_id: Filter by specific company (optional)
+        - sort: earliest (default), cheapest, fastest or most_seats
+        - limit: Maximum results (optional, up to MAX_PAGE_SIZE)
+        - after: next_cursor from the previous page (optional)
+        - format: json (default) or columnar (compact, see utils/columnar.py)
+    
+    Send "Accept: application/x-ndjson" to stream one schedule per line.
     """
     # Get query parameters
     origin = request.args.get('origin', '').strip()
@@ -28,11 +64,24 @@ def search_schedules():
     min_price = request.args.get('min_price', type=float)
     max_price = request.args.get('max_price', type=float)
     company_id = request.args.get('company_id', type=int)
+    sort = request.args.get('sort', 'earliest').strip().lower()
+    limit = request.args.get('limit', type=int)
+    after = request.args.get('after', '').strip() or None
     
     # Validate required parameters
     if not origin or not destination:
         abort(400, description='Origin and destination are required')
     
+    if sort not in SORT_MODES:
+        abort(400, description=f'sort must be one of: {", ".join(SORT_MODES)}')
+    
+    if limit is not None:
+        if limit <= 0:
+            abort(400, description='limit must be positive')
+        limit = min(limit, current_app.config.get('MAX_PAGE_SIZE', 100))
+    
+    columnar = wants_columnar()
+    
     # Parse date
     travel_date = None
     if date_str:
@@ -41,72 +90,687 @@ def search_schedules():
         except ValueError:
             abort(400, description='Invalid date format. Use YYYY-MM-DD')
     
-    # Build query
-    query = db.session.query(Schedules).join(Routes).join(Buses).join(BusCompanies)
+    criteria = ScheduleSearch(
+        origin, destination, travel_date, min_price, max_price, company_id, sort, limit, after
+    )
+    
+    try:
+        # Streaming mode skips the cache and writes rows as they are fetched
+        if wants_ndjson():
+            route_ids, matched = _resolve_route_ids(origin, destination)
+            query = _schedule_search_query(route_ids, criteria)
+            search_analytics.record(origin, destination, travel_date, sort)
+            response = ndjson_response(query, _schedule_result)
+            if matched:
+                response.headers['X-Matched-Origin'] = matched['origin']
+                response.headers['X-Matched-Destination'] = matched['destination']
+            return response
+        
+        result = run_schedule_search(criteria)
+    except ValueError:
+        abort(400, description='Invalid after cursor')
+    
+    search_analytics.record(origin, destination, travel_date, sort, result['count'])
+    
+    if columnar:
+        return jsonify(to_columnar(
+            result['schedules'], next_cursor=result['next_cursor'], matched=result['matched']
+        )), 200
+    
+    return jsonify(result), 200
+
+
+def run_schedule_search(criteria: ScheduleSearch) -> dict:
+    """
+    Run a schedule search, answering from the search cache when possible.
+    
+    Returns:
+        dict: {'count', 'schedules', 'next_cursor', 'matched'} response payload;
+        matched holds the stop names searched when the input was corrected
+    
+    Raises:
+        ValueError: If criteria.after is not a valid cursor
+    """
+    cache_key = criteria.cache_key()
+    result = search_cache.get(cache_key)
+    if result is not None:
+        return result
+    
+    route_ids, matched = _resolve_route_ids(criteria.origin, criteria.destination)
+    
+    # Snapshot route versions before querying so concurrent changes aren't masked
+    token = search_cache.version_token(route_ids)
+    rows = []
+    if route_ids:
+        query = _schedule_search_query(route_ids, criteria)
+        if criteria.limit:
+            # One extra row tells us whether there is a next page
+            query = query.limit(criteria.limit + 1)
+        rows = query.all()
+    
+    next_cursor = None
+    if criteria.limit and len(rows) > criteria.limit:
+        rows = rows[:criteria.limit]
+        next_cursor = _encode_cursor(criteria.sort, rows[-1])
+    
+    results = [_schedule_result(row) for row in rows]
+    result = {
+        'count': len(results),
+        'schedules': results,
+        'next_cursor': next_cursor,
+        'matched': matched
+    }
+    search_cache.set(cache_key, result, token)
+    return result
+
+
+def _matching_route_ids(origin, destination):
+    """Ids of routes matching the origin/destination text (served by the location index)."""
+    bind = db.session.get_bind()
+    return [
+        row.id for row in db.session.query(Routes.id).filter(
+            location_match(Routes.origin, origin, bind),
+            location_match(Routes.destination, destination, bind)
+        )
+    ]
+
+
+def _resolve_route_ids(origin, destination):
+    """
+    Route ids for the origin/destination text, correcting typos if nothing matches as typed.
+    
+    Returns:
+        tuple: (route ids, matched) where matched is None, or
+        {'origin', 'destination'} with the stop names actually searched
+    """
+    route_ids = _matching_route_ids(origin, destination)
+    if route_ids:
+        return route_ids, None
+    
+    resolved_origin = stop_index.resolve(origin)
+    resolved_destination = stop_index.resolve(destination)
+    if resolved_origin is None and resolved_destination is None:
+        return route_ids, None
+    
+    matched = {
+        'origin': resolved_origin or origin,
+        'destination': resolved_destination or destination
+    }
+    return _matching_route_ids(matched['origin'], matched['destination']), matched
+
+
+def _duration_expr(bind):
+    """Trip duration in seconds, matching the ix_schedules_route_duration index expression."""
+    if bind.dialect.name == 'postgresql':
+        return func.extract('epoch', Schedules.arrival_time - Schedules.departure_time)
+    if bind.dialect.name == 'sqlite':
+        # Whole seconds; the format is rendered inline so the expression matches the index
+        seconds = literal_column("'%s'")
+        return cast(
+            func.strftime(seconds, Schedules.arrival_time) - func.strftime(seconds, Schedules.departure_time),
+            Integer
+        )
+    return func.timestampdiff(literal_column('SECOND'), Schedules.departure_time, Schedules.arrival_time)
+
+
+def _sort_keys(sort, bind):
+    """(expression, descending) pairs for a sort mode; always ends on a unique key."""
+    tail = [(Schedules.departure_time, False), (Schedules.id, False)]
+    if sort == 'cheapest':
+        return [(Schedules.price, False)] + tail
+    if sort == 'fastest':
+        return [(_duration_expr(bind), False)] + tail
+    if sort == 'most_seats':
+        return [(Schedules.available_seats, True)] + tail
+    return tail
+
+
+def _encode_cursor(sort, row):
+    values = [row.departure_time.isoformat(), row.id]
+    if sort != 'earliest':
+        # PostgreSQL returns durations as Decimal
+        value = row.sort_value
+        values.insert(0, value if isinstance(value, int) else float(value))
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(sort, cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        expected = 2 if sort == 'earliest' else 3
+        if not isinstance(values, list) or len(values) != expected:
+            raise ValueError('Invalid cursor')
+        values[-2] = datetime.fromisoformat(values[-2])
+        values[-1] = int(values[-1])
+        return values
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def _keyset_filter(keys, values):
+    """Rows strictly after values in (keys) order, e.g. (a > x) OR (a = x AND b > y) ..."""
+    clauses = []
+    for i, ((expression, descending), value) in enumerate(zip(keys, values)):
+        equal_before = [keys[j][0] == values[j] for j in range(i)]
+        beyond = expression < value if descending else expression > value
+        clauses.append(and_(*equal_before, beyond))
+    return or_(*clauses)
+
+
+def _schedule_search_query(route_ids, criteria: ScheduleSearch):
+    """
+    Build the schedule search query for the given routes.
+    
+    Projects exactly the response columns in one SELECT (no ORM hydration,
+    no per-row lazy loads of route/bus/company); format rows with _schedule_result.
+    Ordering, the after cursor and limit are applied in SQL.
+    
+    Raises:
+        ValueError: If criteria.after is not a valid cursor
+    """
+    bind = db.session.get_bind()
+    keys = _sort_keys(criteria.sort, bind)
+    
+    query = db.session.query(
+        Schedules.id,
+        Schedules.departure_time,
+        Schedules.arrival_time,
+        Schedules.price,
+        Schedules.available_seats,
+        Routes.id.label('route_id'),
+        Routes.origin,
+        Routes.destination,
+        Routes.distance,
+        Buses.id.label('bus_id'),
+        Buses.bus_number,
+        Buses.seating_capacity,
+        BusCompanies.id.label('company_id'),
+        BusCompanies.name.label('company_name'),
+        BusCompanies.description.label('company_description'),
+        keys[0][0].label('sort_value')
+    ).select_from(Schedules).join(Routes).join(Buses).join(BusCompanies)
+    
+    has_seats = Schedules.available_seats > 0
+    upcoming = Schedules.departure_time > datetime.now(timezone.utc)
+    if bind.dialect.name == 'sqlite' and not criteria.travel_date and criteria.sort in ('cheapest', 'fastest'):
+        # Without statistics SQLite takes these ranges for selective and sorts
+        # their rows in a temp b-tree; they keep nearly every row, so say so
+        # and it reads the sort index in order instead
+        likely = literal_column('0.9375')
+        has_seats = func.likelihood(has_seats, likely)
+        upcoming = func.likelihood(upcoming, likely)
     
     # Apply filters
     query = query.filter(
         and_(
-            Routes.origin.ilike(f'%{origin}%'),
-            Routes.destination.ilike(f'%{destination}%'),
-            Schedules.available_seats > 0,
-            Schedules.departure_time > datetime.now(timezone.utc),
+            Schedules.route_id.in_(route_ids),
+            has_seats,
+            upcoming,
             BusCompanies.status == 'registered'
         )
     )
     
-    # Date filter
-    if travel_date:
+    # Date filter: local travel day as a UTC range on the indexed column
+    if criteria.travel_date:
+        day_start, day_end = local_day_bounds(criteria.travel_date)
         query = query.filter(
-            func.date(Schedules.departure_time) == travel_date
+            Schedules.departure_time >= day_start,
+            Schedules.departure_time < day_end
         )
     
     # Price filters
-    if min_price is not None:
-        query = query.filter(Schedules.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Schedules.price <= max_price)
+    if criteria.min_price is not None:
+        query = query.filter(Schedules.price >= criteria.min_price)
+    if criteria.max_price is not None:
+        query = query.filter(Schedules.price <= criteria.max_price)
     
     # Company filter
+    if criteria.company_id:
+        query = query.filter(Buses.company_id == criteria.company_id)
+    
+    # Continue after the previous page
+    if criteria.after:
+        query = query.filter(_keyset_filter(keys, _decode_cursor(criteria.sort, criteria.after)))
+    
+    query = query.order_by(*[
+        expression.desc() if descending else expression.asc()
+        for expression, descending in keys
+    ])
+    
+    if criteria.limit:
+        query = query.limit(criteria.limit)
+    
+    return query
+
+
+def _schedule_result(row):
+    """Format a projected search row (see _schedule_search_query) for the response."""
+    return {
+        'schedule_id': row.id,
+        'departure_time': row.departure_time.isoformat(),
+        'arrival_time': row.arrival_time.isoformat(),
+        'price': row.price,
+        'available_seats': row.available_seats,
+        'route': {
+            'id': row.route_id,
+            'origin': row.origin,
+            'destination': row.destination,
+            'distance': row.distance
+        },
+        'bus': {
+            'id': row.bus_id,
+            'bus_number': row.bus_number,
+            'seating_capacity': row.seating_capacity
+        },
+        'company': {
+            'id': row.company_id,
+            'name': row.company_name,
+            'description': row.company_description
+        }
+    }
+
+
+@search_bp.route('/round-trip', methods=['GET'])
+def search_round_trip():
+    """
+    Search outbound and return schedules together, in one query.
+    
+    Query Parameters:
+        - origin: Departure location
+        - destination: Arrival location
+        - date: Outbound travel date (YYYY-MM-DD, local day, optional)
+        - return_date: Return travel date (YYYY-MM-DD, local day, optional)
+        - min_price, max_price, company_id: As for /schedules, applied to both legs
+    
+    Return schedules departing before the earliest outbound arrival are left out.
+    """
+    origin = request.args.get('origin', '').strip()
+    destination = request.args.get('destination', '').strip()
+    date_str = request.args.get('date', '').strip()
+    return_date_str = request.args.get('return_date', '').strip()
+    min_price = request.args.get('min_price', type=float)
+    max_price = request.args.get('max_price', type=float)
+    company_id = request.args.get('company_id', type=int)
+    
+    if not origin or not destination:
+        abort(400, description='Origin and destination are required')
+    
+    try:
+        outbound_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else None
+        return_date = datetime.strptime(return_date_str, '%Y-%m-%d').date() if return_date_str else None
+    except ValueError:
+        abort(400, description='Invalid date format. Use YYYY-MM-DD')
+    
+    if outbound_date and return_date and return_date < outbound_date:
+        abort(400, description='return_date must not be before date')
+    
+    cache_key = search_cache.make_key(
+        'round_trip', origin, destination, outbound_date, return_date, min_price, max_price, company_id
+    )
+    result = search_cache.get(cache_key)
+    if result is None:
+        result = _round_trip_result(
+            origin, destination, outbound_date, return_date, min_price, max_price, company_id, cache_key
+        )
+    
+    search_analytics.record(origin, destination, outbound_date, 'round_trip', result['outbound']['count'])
+    
+    return jsonify(result), 200
+
+
+def _round_trip_result(origin, destination, outbound_date, return_date, min_price, max_price, company_id, cache_key):
+    outbound_ids, return_ids, matched = _resolve_round_trip_route_ids(origin, destination)
+    
+    token = search_cache.version_token(sorted(set(outbound_ids) | set(return_ids)))
+    legs = {'outbound': [], 'return': []}
+    if outbound_ids and return_ids:
+        criteria = ScheduleSearch(origin, destination, None, min_price, max_price, company_id)
+        query = _schedule_search_query(outbound_ids + return_ids, criteria)
+        
+        # One SELECT for both legs: each row is tagged with its direction
+        is_outbound = Schedules.route_id.in_(outbound_ids)
+        outbound_filter = [is_outbound]
+        return_filter = [Schedules.route_id.in_(return_ids)]
+        for filters, day in ((outbound_filter, outbound_date), (return_filter, return_date)):
+            if day:
+                day_start, day_end = local_day_bounds(day)
+                filters += [Schedules.departure_time >= day_start, Schedules.departure_time < day_end]
+        
+        query = query.add_columns(
+            case((and_(*outbound_filter), literal('outbound')), else_=literal('return')).label('direction')
+        ).filter(or_(and_(*outbound_filter), and_(*return_filter)))
+        
+        for row in query:
+            legs[row.direction].append(row)
+    
+    # A return leg has to leave after the earliest possible outbound arrival
+    if legs['outbound']:
+        earliest_arrival = min(row.arrival_time for row in legs['outbound'])
+        legs['return'] = [row for row in legs['return'] if row.departure_time >= earliest_arrival]
+    else:
+        legs['return'] = []
+    
+    result = {
+        direction: {
+            'count': len(rows),
+            'schedules': [_schedule_result(row) for row in rows]
+        }
+        for direction, rows in legs.items()
+    }
+    result['matched'] = matched
+    search_cache.set(cache_key, result, token)
+    return result
+
+
+def _resolve_round_trip_route_ids(origin, destination):
+    """
+    Outbound and return route ids in one lookup, correcting typos if either
+    direction matches nothing as typed.
+    
+    Returns:
+        tuple: (outbound route ids, return route ids, matched), matched as in _resolve_route_ids
+    """
+    outbound_ids, return_ids = _matching_round_trip_route_ids(origin, destination)
+    if outbound_ids and return_ids:
+        return outbound_ids, return_ids, None
+    
+    resolved_origin = stop_index.resolve(origin)
+    resolved_destination = stop_index.resolve(destination)
+    if resolved_origin is None and resolved_destination is None:
+        return outbound_ids, return_ids, None
+    
+    matched = {
+        'origin': resolved_origin or origin,
+        'destination': resolved_destination or destination
+    }
+    return (*_matching_round_trip_route_ids(matched['origin'], matched['destination']), matched)
+
+
+def _matching_round_trip_route_ids(origin, destination):
+    """
+    Outbound and return route ids, matched on the in-memory route catalog so
+    the schedules SELECT is the round trip's only database round trip.
+    """
+    outbound_ids = [route['id'] for route in catalog.routes(origin, destination)]
+    return_ids = [route['id'] for route in catalog.routes(destination, origin)]
+    return outbound_ids, return_ids
+
+
+@search_bp.route('/calendar', methods=['GET'])
+def search_fare_calendar():
+    """
+    Fare calendar: per local day around a travel date, the cheapest fare,
+    number of departures and total available seats.
+    
+    Query Parameters:
+        - origin: Departure location
+        - destination: Arrival location
+        - date: Centre of the window (YYYY-MM-DD, local day). Defaults to today
+        - days: Days either side of date (default: 3, max: 14)
+        - company_id: Filter by specific company (optional)
+    """
+    origin = request.args.get('origin', '').strip()
+    destination = request.args.get('destination', '').strip()
+    date_str = request.args.get('date', '').strip()
+    days = request.args.get('days', 3, type=int)
+    company_id = request.args.get('company_id', type=int)
+    
+    if not origin or not destination:
+        abort(400, description='Origin and destination are required')
+    
+    if days < 0 or days > 14:
+        abort(400, description='days must be between 0 and 14')
+    
+    now = datetime.now(timezone.utc)
+    if date_str:
+        try:
+            centre = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            abort(400, description='Invalid date format. Use YYYY-MM-DD')
+    else:
+        centre = now.astimezone(local_timezone()).date()
+    
+    first_day = centre - timedelta(days=days)
+    last_day = centre + timedelta(days=days)
+    window_start = local_day_bounds(first_day)[0]
+    window_end = local_day_bounds(last_day)[1]
+    
+    # One grouped aggregate over the whole window
+    bind = db.session.get_bind()
+    travel_day = local_date_expr(Schedules.departure_time, bind, at=window_start).label('travel_day')
+    
+    query = db.session.query(
+        travel_day,
+        func.min(Schedules.price).label('min_price'),
+        func.count(Schedules.id).label('departures'),
+        func.sum(Schedules.available_seats).label('available_seats')
+    ).select_from(Schedules).join(Routes).join(Buses).join(BusCompanies).filter(
+        location_match(Routes.origin, origin, bind),
+        location_match(Routes.destination, destination, bind),
+        Schedules.available_seats > 0,
+        Schedules.departure_time >= max(window_start, now),
+        Schedules.departure_time < window_end,
+        BusCompanies.status == 'registered'
+    )
+    
     if company_id:
         query = query.filter(Buses.company_id == company_id)
     
-    # Order by departure time
-    query = query.order_by(Schedules.departure_time.asc())
-    
-    # Execute query
-    schedules = query.all()
-    
-    # Format response
-    results = []
-    for schedule in schedules:
-        results.append({
-            'schedule_id': schedule.id,
-            'departure_time': schedule.departure_time.isoformat(),
-            'arrival_time': schedule.arrival_time.isoformat(),
-            'price': schedule.price,
-            'available_seats': schedule.available_seats,
-            'route': {
-                'id': schedule.route.id,
-                'origin': schedule.route.origin,
-                'destination': schedule.route.destination,
-                'distance': schedule.route.distance
-            },
-            'bus': {
-                'id': schedule.bus.id,
-                'bus_number': schedule.bus.bus_number,
-                'seating_capacity': schedule.bus.seating_capacity
-            },
-            'company': {
-                'id': schedule.bus.company.id,
-                'name': schedule.bus.company.name,
-                'description': schedule.bus.company.description
-            }
+    rows = {
+        str(row.travel_day): row
+        for row in query.group_by(travel_day)
+    }
+    
+    # Every day in the window is listed, including those without departures
+    calendar = []
+    day = first_day
+    while day <= last_day:
+        row = rows.get(day.isoformat())
+        calendar.append({
+            'date': day.isoformat(),
+            'min_price': row.min_price if row else None,
+            'departures': row.departures if row else 0,
+            'available_seats': int(row.available_seats) if row else 0
         })
+        day += timedelta(days=1)
+    
+    return jsonify({
+        'from_date': first_day.isoformat(),
+        'to_date': last_day.isoformat(),
+        'calendar': calendar
+    }), 200
+
+@search_bp.route('/connections', methods=['GET'])
+def search_connections():
+    """
+    Search for connecting journeys between towns with no direct route.
+    Answered from the in-memory timetable, not the database.
+    
+    Query Parameters:
+        - origin: Departure location
+        - destination: Arrival location
+        - date: Travel date (YYYY-MM-DD, local day). Defaults to the next 24 hours
+        - max_transfers: 1 or 2 (default: 2)
+        - min_transfer: Minimum minutes between legs (optional)
+        - limit: Maximum itineraries (default: 5, max: 20)
+    """
+    origin = request.args.get('origin', '').strip()
+    destination = request.args.get('destination', '').strip()
+    date_str = request.args.get('date', '').strip()
+    max_transfers = request.args.get('max_transfers', 2, type=int)
+    min_transfer = request.args.get(
+        'min_transfer', current_app.config.get('CONNECTION_MIN_TRANSFER_MINUTES', 30), type=int
+    )
+    limit = request.args.get('limit', 5, type=int)
+    
+    if not origin or not destination:
+        abort(400, description='Origin and destination are required')
+    
+    if max_transfers not in (1, 2):
+        abort(400, description='max_transfers must be 1 or 2')
+    
+    if min_transfer < 0:
+        abort(400, description='min_transfer cannot be negative')
+    
+    limit = max(1, min(limit, 20))
+    
+    now = datetime.now(timezone.utc)
+    if date_str:
+        try:
+            travel_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            abort(400, description='Invalid date format. Use YYYY-MM-DD')
+        start, end = local_day_bounds(travel_date)
+        start = max(start, now)
+    else:
+        start, end = now, now + timedelta(hours=24)
+    
+    if end <= start:
+        abort(400, description='Travel date is in the past')
+    
+    with timetable.reading() as view:
+        if start >= view.covers_until:
+            abort(400, description='Connection search only covers the next '
+                                   f'{int(timetable.horizon.total_seconds() // 86400)} days')
+        
+        itineraries = find_itineraries(
+            view,
+            view.match_stops(origin),
+            view.match_stops(destination),
+            start,
+            end,
+            min_transfer=timedelta(minutes=min_transfer),
+            max_transfers=max_transfers,
+            limit=limit
+        )
+        results = [itinerary.to_dict() for itinerary in itineraries]
     
     return jsonify({
         'count': len(results),
-        'schedules': results
+        'itineraries': results
+    }), 200
+
+
+@search_bp.route('/departures/<origin>', methods=['GET'])
+def departure_board(origin: str):
+    """
+    Departure board for a town: upcoming departures with live seat counts.
+    Served from the in-memory timetable.
+    
+    Query Parameters:
+        - hours: How far ahead to look (default: 6)
+        - limit: Maximum departures (default: 50, max: 200)
+    """
+    hours = request.args.get('hours', 6, type=int)
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    
+    if hours <= 0:
+        abort(400, description='hours must be positive')
+    
+    now = datetime.now(timezone.utc)
+    until = now + timedelta(hours=hours)
+    
+    with timetable.reading() as view:
+        stops = view.match_stops(origin.strip())
+        if not stops:
+            abort(404, description=f'No upcoming departures from {origin}')
+        
+        until = min(until, view.covers_until)
+        departures = [departure.to_dict() for departure in view.board(stops, now, until, limit)]
+        origins = sorted(view.stops[stop] for stop in stops)
+    
+    return jsonify({
+        'origin': origins[0] if len(origins) == 1 else origins,
+        'from': now.isoformat(),
+        'until': until.isoformat(),
+        'count': len(departures),
+        'departures': departures
+    }), 200
+
+
+@search_bp.route('/nearby', methods=['GET'])
+def departures_nearby():
+    """
+    Upcoming departures from the stops nearest to a point.
+    Served from the in-memory stop grid and timetable.
+    
+    Query Parameters:
+        - lat, lon: Position in decimal degrees
+        - radius: Search radius in km (default: 10, max: 100)
+        - stops: Number of nearest stops to include (default: 3, max: 10)
+        - hours: How far ahead to look (default: 6)
+        - limit: Maximum departures (default: 50, max: 200)
+    """
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    radius = request.args.get('radius', 10, type=float)
+    k = max(1, min(request.args.get('stops', 3, type=int), 10))
+    hours = request.args.get('hours', 6, type=int)
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    
+    if lat is None or lon is None:
+        abort(400, description='lat and lon are required')
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        abort(400, description='lat must be within [-90, 90] and lon within [-180, 180]')
+    if not 0 < radius <= 100:
+        abort(400, description='radius must be between 0 and 100 km')
+    if hours <= 0:
+        abort(400, description='hours must be positive')
+    
+    nearest = stop_locator.nearest(lat, lon, k, radius)
+    distances = {stop_key(stop.name): distance for distance, stop in nearest}
+    
+    now = datetime.now(timezone.utc)
+    until = now + timedelta(hours=hours)
+    
+    with timetable.reading() as view:
+        until = min(until, view.covers_until)
+        stops = [key for key in distances if key in view.stops]
+        departures = []
+        for departure in (view.board(stops, now, until, limit) if stops else []):
+            result = departure.to_dict()
+            result['distance_km'] = round(distances[departure.origin_key], 2)
+            departures.append(result)
+    
+    return jsonify({
+        'stops': [
+            {
+                'name': stop.name,
+                'latitude': stop.latitude,
+                'longitude': stop.longitude,
+                'distance_km': round(distance, 2)
+            }
+            for distance, stop in nearest
+        ],
+        'from': now.isoformat(),
+        'until': until.isoformat(),
+        'count': len(departures),
+        'departures': departures
+    }), 200
+
+
+@search_bp.route('/suggest', methods=['GET'])
+def suggest_stops():
+    """
+    Typeahead suggestions for stop names, most booked first.
+    Served from the in-memory stop index.
+    
+    Query Parameters:
+        - q: Text typed so far (matches the start of any word)
+        - limit: Maximum suggestions (default: 8, max: 20)
+    """
+    prefix = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', 8, type=int), 20))
+    
+    suggestions = [
+        {'name': name, 'popularity': weight}
+        for name, weight in stop_index.suggest(prefix, limit)
+    ]
+    
+    return jsonify({
+        'count': len(suggestions),
+        'suggestions': suggestions
     }), 200
 
 
@@ -122,18 +786,12 @@ def search_routes():
     origin = request.args.get('origin', '').strip()
     destination = request.args.get('destination', '').strip()
     
-    query = Routes.query
-    
-    if origin:
-        query = query.filter(Routes.origin.ilike(f'%{origin}%'))
-    if destination:
-        query = query.filter(Routes.destination.ilike(f'%{destination}%'))
-    
-    routes = query.all()
+    # Served from the in-memory catalog snapshot
+    routes = catalog.routes(origin, destination)
     
     return jsonify({
         'count': len(routes),
-        'routes': [route.to_dict() for route in routes]
+        'routes': routes
     }), 200
 
 
@@ -147,15 +805,11 @@ def search_companies():
     """
     name = request.args.get('name', '').strip()
     
-    query = BusCompanies.query.filter_by(status='registered')
-    
-    if name:
-        query = query.filter(BusCompanies.name.ilike(f'%{name}%'))
-    
-    companies = query.all()
+    # Served from the in-memory catalog snapshot
+    companies = catalog.companies(name)
     
     return jsonify({
         'count': len(companies),
-        'companies': [company.to_dict() for company in companies]
+        'companies': companies
     }), 200
 
@@ -35,9 +35,23 @@ class BaseConfig:
     _paychangu_mode = os.getenv('PAYCHANGU_MODE', 'sandbox').lower()
     PAYCHANGU_MODE = _paychangu_mode if _paychangu_mode in ['sandbox', 'live'] else 'sandbox'
 
+    # Local timezone used for travel days and date filters
+    TIMEZONE = os.getenv('TIMEZONE', 'Africa/Blantyre')
+
     # Platform Settings
     PLATFORM_FEE = float(os.getenv('PLATFORM_FEE', '3000'))  # MWK 3000
 
+    # How long a pending booking holds its seat while the passenger pays
+    SEAT_HOLD_MINUTES = int(os.getenv('SEAT_HOLD_MINUTES', 15))
+    # How bookings take seats: 'inventory' claims a schedule_seats row per seat,
+    # 'counter' only decrements schedules.available_seats (one conditional UPDATE;
+    # no seat numbers or holds), 'locked' does the same under SELECT ... FOR UPDATE
+    # (the baseline). Compare them with benchmark_booking.py
+    _seat_strategy = os.getenv('BOOKING_SEAT_STRATEGY', 'inventory').lower()
+    BOOKING_SEAT_STRATEGY = _seat_strategy if _seat_strategy in ['inventory', 'counter', 'locked'] else 'inventory'
+    # Most seats a single group booking may take
+    GROUP_BOOKING_MAX_SEATS = int(os.getenv('GROUP_BOOKING_MAX_SEATS', 10))
+
     # Frontend URL
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
@@ -58,10 +72,65 @@ class BaseConfig:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf'}
 
+    # Rendered ticket QR images: stored on disk (default UPLOAD_FOLDER/tickets),
+    # the most recent QR_CACHE_SIZE also kept in memory per worker
+    QR_CACHE_FOLDER = os.getenv('QR_CACHE_FOLDER')
+    QR_CACHE_SIZE = int(os.getenv('QR_CACHE_SIZE', 256))
+
+    # Rows fetched per batch when streaming NDJSON responses
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 200))
+
     # Pagination
     DEFAULT_PAGE_SIZE = 20
     MAX_PAGE_SIZE = 100
 
+    # Search result cache (per process)
+    SEARCH_CACHE_ENABLED = os.getenv('SEARCH_CACHE_ENABLED', 'True').lower() == 'true'
+    SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', 512))
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 30))  # seconds
+
+    # In-memory timetable used by connection search
+    TIMETABLE_HORIZON_HOURS = int(os.getenv('TIMETABLE_HORIZON_HOURS', 168))
+    TIMETABLE_MAX_AGE = int(os.getenv('TIMETABLE_MAX_AGE', 300))  # seconds
+    CONNECTION_MIN_TRANSFER_MINUTES = int(os.getenv('CONNECTION_MIN_TRANSFER_MINUTES', 30))
+
+    # Stop name typeahead index: rebuild at least this often (seconds)
+    STOP_INDEX_MAX_AGE = int(os.getenv('STOP_INDEX_MAX_AGE', 3600))
+    # Largest edit distance accepted when correcting misspelled stop names
+    STOP_MATCH_MAX_DISTANCE = int(os.getenv('STOP_MATCH_MAX_DISTANCE', 2))
+
+    # Company/route catalog snapshot: rebuild at least this often (seconds)
+    CATALOG_MAX_AGE = int(os.getenv('CATALOG_MAX_AGE', 300))
+
+    # Cell size of the in-memory stop grid used by nearby search (~11 km)
+    STOP_GRID_CELL_DEGREES = float(os.getenv('STOP_GRID_CELL_DEGREES', 0.1))
+
+    # Search telemetry: buffered in memory, written to search_events in the background
+    SEARCH_ANALYTICS_ENABLED = os.getenv('SEARCH_ANALYTICS_ENABLED', 'True').lower() == 'true'
+    SEARCH_ANALYTICS_BUFFER_SIZE = int(os.getenv('SEARCH_ANALYTICS_BUFFER_SIZE', 10000))
+    SEARCH_ANALYTICS_FLUSH_INTERVAL = float(os.getenv('SEARCH_ANALYTICS_FLUSH_INTERVAL', 5))  # seconds
+    SEARCH_ANALYTICS_WINDOW = int(os.getenv('SEARCH_ANALYTICS_WINDOW', 3600))  # popularity window, seconds
+
+    # Cache warm-up: every CACHE_WARM_INTERVAL seconds (0 = off) each worker
+    # re-runs the search for its CACHE_WARM_TOP_PAIRS hottest route pairs, for
+    # today and the next CACHE_WARM_DAYS - 1 local travel dates
+    CACHE_WARM_INTERVAL = int(os.getenv('CACHE_WARM_INTERVAL', 0))
+    CACHE_WARM_TOP_PAIRS = int(os.getenv('CACHE_WARM_TOP_PAIRS', 20))
+    CACHE_WARM_LOOKBACK_DAYS = int(os.getenv('CACHE_WARM_LOOKBACK_DAYS', 30))
+    CACHE_WARM_DAYS = int(os.getenv('CACHE_WARM_DAYS', 3))
+
+    # Unpaid booking sweeper: every BOOKING_SWEEP_INTERVAL seconds (0 = off) each
+    # worker releases expired seat holds and cancels bookings left pending for
+    # longer than BOOKING_ABANDON_MINUTES
+    BOOKING_SWEEP_INTERVAL = int(os.getenv('BOOKING_SWEEP_INTERVAL', 60))
+    BOOKING_ABANDON_MINUTES = int(os.getenv('BOOKING_ABANDON_MINUTES', 60))
+
+    # Idempotency-Key responses: kept this many hours, the most recent cached per worker
+    IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 24))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 1024))
+    # A key still in progress after this many minutes is taken over by the next retry
+    IDEMPOTENCY_LEASE_MINUTES = int(os.getenv('IDEMPOTENCY_LEASE_MINUTES', 5))
+
     # Session Configuration
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
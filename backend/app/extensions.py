@@ -3,6 +3,16 @@ from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_mail import Mail
 from flask_login import LoginManager
+from .utils.search_cache import SearchCache
+from .utils.timetable import Timetable
+from .utils.stop_index import StopIndex
+from .utils.catalog import Catalog
+from .utils.geo_index import StopLocator
+from .utils.search_analytics import SearchAnalytics
+from .utils.cache_warmer import CacheWarmer
+from .utils.booking_sweeper import BookingSweeper
+from .utils.idempotency import IdempotencyStore
+from .utils.ticket_cache import TicketCache
 
 # Flask extensions
 db = SQLAlchemy()
@@ -11,5 +21,27 @@ cors = CORS()
 mail = Mail()
 login = LoginManager()
 
+# In-process caches
+search_cache = SearchCache()
+timetable = Timetable()
+stop_index = StopIndex()
+catalog = Catalog()
+stop_locator = StopLocator()
+
+# Search telemetry (buffered, flushed in the background)
+search_analytics = SearchAnalytics()
+
+# Startup/periodic warm-up of the caches above
+cache_warmer = CacheWarmer()
+
+# Releases expired seat holds and abandoned bookings in the background
+booking_sweeper = BookingSweeper()
+
+# Stored responses for retried write requests (Idempotency-Key)
+idempotency = IdempotencyStore()
+
+# Rendered ticket QR images (disk + in-memory LRU)
+ticket_cache = TicketCache()
+
 # PayChangu client - will be initialized in __init__.py after config loads
 paychangu_client = None
@@ -5,6 +5,9 @@ from flask_login import UserMixin
 from datetime import datetime, timezone, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# Confirmed bookings can be cancelled until this long before departure
+CANCELLATION_WINDOW = timedelta(hours=24)
+
 
 class Users(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -188,9 +191,18 @@ class Routes(db.Model):
 
     schedules = db.relationship('Schedules', backref='route', lazy=True)
 
-    # Composite index for origin-destination pair
+    # Composite index for origin-destination pair, plus trigram indexes for
+    # substring search (PostgreSQL only; SQLite uses the routes_fts table)
     __table_args__ = (
         db.Index('ix_routes_origin_destination', 'origin', 'destination'),
+        db.Index(
+            'ix_routes_origin_trgm', 'origin',
+            postgresql_using='gin', postgresql_ops={'origin': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+        db.Index(
+            'ix_routes_destination_trgm', 'destination',
+            postgresql_using='gin', postgresql_ops={'destination': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
     )
 
     def __repr__(self):
@@ -205,6 +217,27 @@ class Routes(db.Model):
         }
 
 
+class Stops(db.Model):
+    __tablename__ = 'stops'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Matches Routes.origin / Routes.destination (compared case-insensitively)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "latitude": self.latitude,
+            "longitude": self.longitude
+        }
+
+    def __repr__(self):
+        return f"<Stop {self.id} | {self.name}>"
+
+
 class Schedules(db.Model):
     __tablename__ = 'schedules'
 
@@ -218,8 +251,15 @@ class Schedules(db.Model):
 
     bookings = db.relationship('Bookings', backref='schedule', lazy=True)
 
+    # Composite indexes backing the search sort modes (earliest, cheapest,
+    # most_seats); the fastest sort uses the dialect-specific expression index
+    # ix_schedules_route_duration created in its migration
     __table_args__ = (
         db.Index('ix_schedules_route_departure', 'route_id', 'departure_time', 'arrival_time'),
+        db.Index('ix_schedules_route_price', 'route_id', 'price', 'departure_time'),
+        db.Index('ix_schedules_route_seats', 'route_id', 'available_seats', 'departure_time'),
+        # Company schedule listings: the company's buses over a date range
+        db.Index('ix_schedules_bus_departure', 'bus_id', 'departure_time'),
     )
 
     def to_dict(self):
@@ -236,6 +276,39 @@ class Schedules(db.Model):
         }
 
 
+class ScheduleSeats(db.Model):
+    __tablename__ = 'schedule_seats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id'), nullable=False)
+    seat_number = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='available')
+    # Status values: 'available', 'held' (pending payment, until held_until), 'booked'
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=True, index=True)
+    held_until = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    # One row per seat; free seats of a schedule are found through the composite
+    # index, expired holds through the status/held_until one
+    __table_args__ = (
+        db.UniqueConstraint('schedule_id', 'seat_number', name='uq_schedule_seats_schedule_seat'),
+        db.Index('ix_schedule_seats_schedule_status', 'schedule_id', 'status'),
+        db.Index('ix_schedule_seats_status_held_until', 'status', 'held_until'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "schedule_id": self.schedule_id,
+            "seat_number": self.seat_number,
+            "status": self.status,
+            "booking_id": self.booking_id,
+            "held_until": self.held_until.isoformat() if self.held_until else None
+        }
+
+    def __repr__(self):
+        return f"<ScheduleSeat {self.schedule_id} | {self.seat_number} | {self.status}>"
+
+
 class Bookings(db.Model):
     __tablename__ = 'bookings'
 
@@ -249,7 +322,9 @@ class Bookings(db.Model):
     
     payment_link = db.Column(db.String(200), nullable=True)
     tx_ref = db.Column(db.String(100), nullable=True, unique=True, index=True)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now(timezone.utc), index=True)
+    # Shared by the bookings of one group booking; only the first carries the tx_ref
+    group_reference = db.Column(db.String(40), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
     cancelled_at = db.Column(db.DateTime, nullable=True)
     boarded_at = db.Column(db.DateTime, nullable=True)  # Track when passenger boarded
 
@@ -258,12 +333,17 @@ class Bookings(db.Model):
     schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
 
-    def generate_qr_reference(self):
-        """Generate unique QR code reference"""
+    @staticmethod
+    def make_qr_reference(booking_id):
+        """Unique QR code reference for a booking id"""
         import secrets
         timestamp = int(datetime.now(timezone.utc).timestamp())
         random_part = secrets.token_hex(8)
-        self.qr_code_reference = f"UTK-{self.id}-{timestamp}-{random_part}"
+        return f"UTK-{booking_id}-{timestamp}-{random_part}"
+
+    def generate_qr_reference(self):
+        """Generate unique QR code reference"""
+        self.qr_code_reference = self.make_qr_reference(self.id)
         return self.qr_code_reference
 
     def can_cancel(self):
@@ -278,7 +358,7 @@ class Bookings(db.Model):
         if departure_time.tzinfo is None:
             departure_time = departure_time.replace(tzinfo=timezone.utc)
 
-        cancellation_deadline = departure_time - timedelta(hours=24)
+        cancellation_deadline = departure_time - CANCELLATION_WINDOW
         now = datetime.now(timezone.utc)
 
         return now < cancellation_deadline
@@ -312,10 +392,12 @@ class Bookings(db.Model):
         return {
             "id": self.id,
             "status": self.status,
+            "seat_number": self.seat_number,
             "qr_code_reference": self.qr_code_reference,
             "qr_code_status": self.qr_code_reference_status,
             "payment_link": self.payment_link,
             "tx_ref": self.tx_ref,
+            "group_reference": self.group_reference,
             "schedule_id": self.schedule_id,
             "user_id": self.user_id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
@@ -471,4 +553,46 @@ class EmployeeInvitation(db.Model):
         }
 
     def __repr__(self):
-        return f"<EmployeeInvitation {self.id} | {self.email} | {self.role}>"
\ No newline at end of file
+        return f"<EmployeeInvitation {self.id} | {self.email} | {self.role}>"
+
+
+class SearchEvents(db.Model):
+    __tablename__ = 'search_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    origin = db.Column(db.String(100), nullable=False)
+    destination = db.Column(db.String(100), nullable=False)
+    travel_date = db.Column(db.Date, nullable=True)
+    sort = db.Column(db.String(20), nullable=True)
+    result_count = db.Column(db.Integer, nullable=True)
+    searched_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    # Popularity queries group by pair over a time window
+    __table_args__ = (
+        db.Index('ix_search_events_pair', 'origin', 'destination', 'searched_at'),
+    )
+
+    def __repr__(self):
+        return f"<SearchEvent {self.id} | {self.origin} to {self.destination}>"
+
+
+class IdempotencyKeys(db.Model):
+    __tablename__ = 'idempotency_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Hash of method, path and body: a key may only be reused for the same request
+    fingerprint = db.Column(db.String(64), nullable=False)
+    # Null while the first request is still being processed
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+    )
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.user_id} | {self.key} | {self.status_code}>"
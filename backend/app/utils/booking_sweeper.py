@@ -0,0 +1,133 @@
+"""
+Background sweeper for unpaid bookings.
+
+Each run gives back seats whose hold has expired and cancels bookings left
+pending for longer than BOOKING_ABANDON_MINUTES, restoring the seat counters
+of the affected schedules. Both steps are set-based (see seat_inventory), so
+a run costs a fixed handful of statements however many rows it sweeps, and
+nothing is loaded into Python.
+
+With BOOKING_SWEEP_INTERVAL > 0 each worker process sweeps in a background
+thread from its first request on; concurrent sweeps from several workers are
+harmless. `flask sweep-bookings` runs a single sweep, or keeps sweeping with
+--interval, for deployments that prefer a dedicated worker.
+"""
+
+import os
+import time
+import logging
+import threading
+import click
+from flask.cli import with_appcontext
+
+logger = logging.getLogger(__name__)
+
+
+class BookingSweeper:
+    def __init__(self, interval: int = 60, abandon_minutes: int = 60):
+        self.interval = interval
+        self.abandon_minutes = abandon_minutes
+
+        self._app = None
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+
+        # Per-run metrics
+        self.runs = 0
+        self.last_run = None
+        self.totals = {'holds_released': 0, 'bookings_abandoned': 0}
+
+    def init_app(self, app):
+        self.interval = app.config.get('BOOKING_SWEEP_INTERVAL', self.interval)
+        self.abandon_minutes = app.config.get('BOOKING_ABANDON_MINUTES', self.abandon_minutes)
+
+        self._app = app
+        app.extensions['booking_sweeper'] = self
+        app.cli.add_command(sweep_bookings_command)
+
+        if self.interval > 0:
+            # Started from the first request so CLI commands never spin one up
+            app.before_request(self._ensure_worker)
+
+    def sweep(self):
+        """
+        Run one sweep and commit it. Needs an app context.
+
+        Returns:
+            dict: Seats released from expired holds, abandoned bookings cancelled
+            and how long the run took
+        """
+        from app import db
+        from datetime import datetime, timezone, timedelta
+        from .seat_inventory import release_expired_holds, cancel_abandoned_bookings
+
+        started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        try:
+            # Holds first: their bookings are cancelled there and not counted twice
+            holds_released = release_expired_holds(now=now)
+            bookings_abandoned = cancel_abandoned_bookings(
+                now - timedelta(minutes=self.abandon_minutes), now=now
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        stats = {
+            'holds_released': holds_released,
+            'bookings_abandoned': bookings_abandoned,
+            'seconds': round(time.monotonic() - started, 3)
+        }
+        self.runs += 1
+        self.last_run = dict(stats, finished_at=now.isoformat())
+        self.totals['holds_released'] += holds_released
+        self.totals['bookings_abandoned'] += bookings_abandoned
+        if holds_released or bookings_abandoned:
+            logger.info(
+                'Booking sweep released %d expired hold(s), cancelled %d abandoned booking(s) in %.3fs',
+                holds_released, bookings_abandoned, stats['seconds']
+            )
+        return stats
+
+    # Background timer
+
+    def _ensure_worker(self):
+        # One thread per worker process; forked workers start their own
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='booking-sweeper', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self._app.app_context():
+                    self.sweep()
+            except Exception:
+                logger.exception('Booking sweep failed')
+
+
+@click.command('sweep-bookings')
+@click.option('--interval', type=int, default=0, help='Keep sweeping every N seconds (default: sweep once).')
+@with_appcontext
+def sweep_bookings_command(interval):
+    """Release expired seat holds and cancel abandoned pending bookings."""
+    from flask import current_app
+
+    sweeper = current_app.extensions['booking_sweeper']
+    while True:
+        stats = sweeper.sweep()
+        click.echo(
+            f"Released {stats['holds_released']} expired hold(s), cancelled "
+            f"{stats['bookings_abandoned']} abandoned booking(s) in {stats['seconds']}s"
+        )
+        if interval <= 0:
+            break
+        time.sleep(interval)
@@ -0,0 +1,193 @@
+"""
+Warm-up for the search path.
+
+A fresh worker starts with an empty search cache, an unloaded timetable and
+stop index, and no open database connections, so its first searches are the
+slowest. A warm pass:
+
+1. primes the connection pool by checking out (and returning) connections,
+2. loads the timetable and stop index,
+3. runs the schedule search for the hottest origin/destination pairs: the
+   most booked pairs over the last CACHE_WARM_LOOKBACK_DAYS, plus whatever
+   search telemetry says is popular right now. Each pair is searched the way
+   the frontend asks for it, with a travel date, for today and the following
+   CACHE_WARM_DAYS - 1 local days.
+
+With CACHE_WARM_INTERVAL > 0 each worker process runs a pass in a background
+thread as soon as it serves its first request, then repeats every interval
+so the top pairs stay cached. Keep the interval at or below SEARCH_CACHE_TTL.
+`flask warm-cache` runs a single pass from the command line.
+"""
+
+import os
+import time
+import logging
+import threading
+import click
+from flask.cli import with_appcontext
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    def __init__(self, interval: int = 0, top_pairs: int = 20, lookback_days: int = 30, days: int = 3):
+        self.interval = interval
+        self.top_pairs = top_pairs
+        self.lookback_days = lookback_days
+        self.days = days
+
+        self._app = None
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+
+        self.passes = 0
+        self.last_duration = None
+
+    def init_app(self, app):
+        self.interval = app.config.get('CACHE_WARM_INTERVAL', self.interval)
+        self.top_pairs = app.config.get('CACHE_WARM_TOP_PAIRS', self.top_pairs)
+        self.lookback_days = app.config.get('CACHE_WARM_LOOKBACK_DAYS', self.lookback_days)
+        self.days = app.config.get('CACHE_WARM_DAYS', self.days)
+
+        self._app = app
+        app.extensions['cache_warmer'] = self
+        app.cli.add_command(warm_cache_command)
+
+        if self.interval > 0:
+            # Started from the first request rather than here, so CLI commands
+            # (flask db upgrade, ...) never spin up a warmer
+            app.before_request(self._ensure_worker)
+
+    # Pair selection
+
+    def top_booked_pairs(self, limit: int):
+        """Most booked (origin, destination) pairs. Needs an app context."""
+        from app import db
+        from app.models import Routes, Schedules, Bookings
+        from sqlalchemy import func
+        from datetime import datetime, timezone, timedelta
+
+        since = datetime.now(timezone.utc) - timedelta(days=self.lookback_days)
+        bookings = func.count(Bookings.id)
+        rows = db.session.query(
+            Routes.origin, Routes.destination, bookings
+        ).select_from(Bookings).join(Schedules).join(Routes).filter(
+            Bookings.status.in_(['confirmed', 'boarded']),
+            Bookings.created_at >= since
+        ).group_by(Routes.origin, Routes.destination).order_by(bookings.desc()).limit(limit)
+
+        return [(origin, destination) for origin, destination, _ in rows]
+
+    def hot_pairs(self):
+        """Pairs to warm: most booked first, topped up with currently popular searches."""
+        from app.extensions import search_analytics
+        from .stop_index import normalize_name
+
+        pairs = []
+        seen = set()
+        candidates = self.top_booked_pairs(self.top_pairs) + [
+            pair for pair, _ in search_analytics.popular_pairs(self.top_pairs)
+        ]
+        for origin, destination in candidates:
+            key = (normalize_name(origin), normalize_name(destination))
+            if key not in seen:
+                seen.add(key)
+                pairs.append((origin, destination))
+        return pairs[:self.top_pairs]
+
+    def travel_dates(self):
+        """Local travel dates to warm: today and the following days. Needs an app context."""
+        from datetime import datetime, timedelta
+        from .local_time import local_timezone
+
+        today = datetime.now(local_timezone()).date()
+        return [today + timedelta(days=offset) for offset in range(max(self.days, 1))]
+
+    # Warming
+
+    def prime_pool(self):
+        """Open up to pool_size connections so requests don't pay for connecting."""
+        from app import db
+
+        pool = db.engine.pool
+        size = pool.size() if hasattr(pool, 'size') else 1
+        connections = []
+        try:
+            for _ in range(size):
+                connection = db.engine.connect()
+                connection.exec_driver_sql('SELECT 1')
+                connections.append(connection)
+        finally:
+            for connection in connections:
+                connection.close()
+        return len(connections)
+
+    def warm(self):
+        """
+        Run one warm pass. Needs an app context.
+
+        Returns:
+            dict: Number of connections primed, pairs and searches run
+        """
+        from app.extensions import timetable, stop_index
+        from app.blueprints.search import ScheduleSearch, run_schedule_search
+
+        started = time.monotonic()
+        connections = self.prime_pool()
+
+        with timetable.reading():
+            pass
+        stop_index.rebuild()
+
+        # Same keys as the frontend's searches: origin, destination and date,
+        # default sort and no limit
+        pairs = self.hot_pairs()
+        dates = self.travel_dates()
+        for origin, destination in pairs:
+            for travel_date in dates:
+                run_schedule_search(ScheduleSearch(origin, destination, travel_date))
+
+        self.passes += 1
+        self.last_duration = time.monotonic() - started
+        return {
+            'connections': connections,
+            'pairs': len(pairs),
+            'searches': len(pairs) * len(dates),
+            'seconds': round(self.last_duration, 3)
+        }
+
+    # Background timer
+
+    def _ensure_worker(self):
+        # One thread per worker process; forked workers start their own
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            try:
+                with self._app.app_context():
+                    self.warm()
+            except Exception:
+                logger.exception('Cache warm pass failed')
+            time.sleep(self.interval)
+
+
+@click.command('warm-cache')
+@with_appcontext
+def warm_cache_command():
+    """Prime the connection pool and search caches for the hottest route pairs."""
+    from flask import current_app
+
+    stats = current_app.extensions['cache_warmer'].warm()
+    click.echo(
+        f"Primed {stats['connections']} connection(s), warmed {stats['pairs']} pair(s) "
+        f"({stats['searches']} searches) in {stats['seconds']}s"
+    )
@@ -0,0 +1,98 @@
+"""
+In-process snapshot of the company and route catalog.
+
+Registered companies and routes are small, read-mostly tables that several
+listing and search endpoints read on every call. The catalog keeps an
+immutable, versioned snapshot of both and serves those endpoints from it in
+Python, without a database round trip.
+
+The snapshot is rebuilt lazily on the next read after a committed change
+that affects it: a route being added, changed or removed, or a company being
+approved, activated, deactivated or edited (balance updates from payments are
+ignored). CATALOG_MAX_AGE bounds how long changes made by other workers can
+go unnoticed.
+"""
+
+import time
+import threading
+from collections import namedtuple
+from .change_events import subscribe
+
+# Only these company columns appear in the snapshot
+_COMPANY_FIELDS = {'name', 'description', 'status', 'owner_id'}
+
+# Entries are (casefolded search text, to_dict() payload); treat the payloads as read-only
+CatalogSnapshot = namedtuple('CatalogSnapshot', ['version', 'companies', 'routes'])
+
+
+def _fold(text):
+    return ' '.join((text or '').split()).casefold()
+
+
+class Catalog:
+    def __init__(self, max_age: int = 300):
+        self.max_age = max_age
+
+        self._snapshot = None
+        self._built_at = None
+        self._version = 0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        from app.models import Routes, BusCompanies
+
+        self.max_age = app.config.get('CATALOG_MAX_AGE', self.max_age)
+        app.extensions['catalog'] = self
+
+        subscribe(Routes, self._on_route_changes)
+        subscribe(BusCompanies, self._on_company_changes)
+
+    def _on_route_changes(self, changes):
+        self._stale = True
+
+    def _on_company_changes(self, changes):
+        for change in changes:
+            if change.op != 'update' or _COMPANY_FIELDS & change.previous.keys():
+                self._stale = True
+                return
+
+    def rebuild(self):
+        """Load a new snapshot from the database. Needs an app context."""
+        from app.models import Routes, BusCompanies
+
+        with self._lock:
+            # Cleared first so a change committed during the load marks it stale again
+            self._stale = False
+            companies = BusCompanies.query.filter_by(status='registered').order_by(BusCompanies.id).all()
+            routes = Routes.query.order_by(Routes.id).all()
+
+            self._version += 1
+            self._snapshot = CatalogSnapshot(
+                self._version,
+                tuple((_fold(company.name), company.to_dict()) for company in companies),
+                tuple(((_fold(route.origin), _fold(route.destination)), route.to_dict()) for route in routes)
+            )
+            self._built_at = time.monotonic()
+            return self._snapshot
+
+    def snapshot(self) -> CatalogSnapshot:
+        """The current snapshot, rebuilt first if it is stale or too old."""
+        snapshot = self._snapshot
+        if snapshot is None or self._stale or time.monotonic() - self._built_at > self.max_age:
+            snapshot = self.rebuild()
+        return snapshot
+
+    def companies(self, name: str = None):
+        """Registered companies, optionally those whose name contains name (case-insensitive)."""
+        needle = _fold(name)
+        return [company for key, company in self.snapshot().companies if needle in key]
+
+    def routes(self, origin: str = None, destination: str = None):
+        """Routes whose origin/destination contain the given text (case-insensitive)."""
+        origin = _fold(origin)
+        destination = _fold(destination)
+        return [
+            route for (origin_key, destination_key), route in self.snapshot().routes
+            if origin in origin_key and destination in destination_key
+        ]
@@ -0,0 +1,100 @@
+"""
+Post-commit change notifications for models.
+
+In-process caches (search results, timetables, catalogs) need to know when the
+rows they were built from change. Rather than calling every cache from every
+endpoint that touches a schedule, the session records which watched objects
+were inserted, updated or deleted during each flush and hands them to the
+subscribers once the transaction commits. Rolled back changes are discarded.
+
+Bulk UPDATE/DELETE statements bypass the unit of work, so code issuing them
+should call record_change() for the affected rows.
+"""
+
+import logging
+from collections import defaultdict, namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# op: 'insert' | 'update' | 'delete'
+# values: column values known at flush time
+# previous: old values of the columns changed by an update
+ModelChange = namedtuple('ModelChange', ['op', 'id', 'values', 'previous'])
+
+_subscribers = defaultdict(list)
+
+_PENDING_KEY = 'pending_model_changes'
+
+
+def subscribe(model, callback):
+    """
+    Call callback(changes) after every commit that changed rows of model.
+
+    Args:
+        model: Model class to watch
+        callback: Callable receiving a list of ModelChange
+    """
+    if callback not in _subscribers[model.__name__]:
+        _subscribers[model.__name__].append(callback)
+
+
+def record_change(session, model, op, id, values=None, previous=None):
+    """Queue a change made outside the ORM (e.g. a bulk UPDATE)."""
+    if model.__name__ not in _subscribers:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, defaultdict(list))
+    pending[model.__name__].append(ModelChange(op, id, values or {}, previous or {}))
+
+
+def _snapshot(obj):
+    state = inspect(obj)
+    loaded = state.dict
+    values = {}
+    previous = {}
+    for attr in state.mapper.column_attrs:
+        key = attr.key
+        if key in loaded:
+            values[key] = loaded[key]
+        history = state.attrs[key].history
+        if history.deleted:
+            previous[key] = history.deleted[0]
+    return values, previous
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    if not _subscribers:
+        return
+
+    for op, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            name = type(obj).__name__
+            if name not in _subscribers:
+                continue
+            if op == 'update' and not session.is_modified(obj, include_collections=False):
+                continue
+            values, previous = _snapshot(obj)
+            pending = session.info.setdefault(_PENDING_KEY, defaultdict(list))
+            pending[name].append(ModelChange(op, values.get('id'), values, previous))
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    for name, changes in pending.items():
+        for callback in _subscribers.get(name, []):
+            try:
+                callback(changes)
+            except Exception:
+                # A failing cache must never break the request that committed
+                logger.exception(f"Change subscriber {callback!r} failed for {name}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
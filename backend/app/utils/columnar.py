@@ -0,0 +1,87 @@
+"""
+Compact columnar encoding for schedule listings.
+
+Listings normally repeat the same nested route, bus and company objects on
+every row. With "format=columnar" the nested objects are moved into lookup
+tables keyed by id and sent once, and the rows become parallel arrays:
+
+    {
+        "format": "columnar",
+        "count": 2,
+        "columns": {
+            "schedule_id": [11, 12],
+            "departure_time": ["...", "..."],
+            "price": [12000.0, 12000.0],
+            "route_id": [1, 1],
+            "bus_id": [4, 4],
+            ...
+        },
+        "routes": {"1": {...}},
+        "buses": {"4": {...}}
+    }
+
+Row i is rebuilt by reading index i of every column and looking up the
+*_id columns in the matching table.
+"""
+
+from flask import request, abort
+
+FORMATS = ('json', 'columnar')
+
+# Nested object key -> (id column, lookup table name)
+_TABLES = {
+    'route': ('route_id', 'routes'),
+    'bus': ('bus_id', 'buses'),
+    'company': ('company_id', 'companies'),
+}
+
+
+def wants_columnar() -> bool:
+    """True if the request asked for format=columnar; aborts on unknown formats."""
+    response_format = request.args.get('format', 'json').strip().lower()
+    if response_format not in FORMATS:
+        abort(400, description=f'format must be one of: {", ".join(FORMATS)}')
+    return response_format == 'columnar'
+
+
+def to_columnar(rows, **extra) -> dict:
+    """
+    Encode serialized rows (dicts) column-wise.
+
+    Args:
+        rows: List of row dicts; nested route/bus/company dicts need an "id"
+        extra: Additional top-level keys for the payload (e.g. next_cursor)
+    """
+    columns = {}
+    tables = {}
+
+    for index, row in enumerate(rows):
+        values = {}
+        for key, value in row.items():
+            if key in _TABLES:
+                id_column, table = _TABLES[key]
+                entity_id = value['id'] if value else None
+                if entity_id is not None:
+                    tables.setdefault(table, {}).setdefault(str(entity_id), value)
+                values[id_column] = entity_id
+            elif key not in values:
+                values[key] = value
+
+        for key, value in values.items():
+            column = columns.get(key)
+            if column is None:
+                # Pad columns that first appear part-way through
+                column = columns[key] = [None] * index
+            column.append(value)
+        for key, column in columns.items():
+            if key not in values:
+                column.append(None)
+
+    payload = {
+        'format': 'columnar',
+        'count': len(rows),
+        'columns': columns
+    }
+    payload.update(tables)
+    payload.update(extra)
+    return payload
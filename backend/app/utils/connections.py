@@ -0,0 +1,166 @@
+"""
+Connecting-journey search over the in-memory timetable.
+
+Two passes over the timetable's departures (connections):
+
+1. A Connection Scan (CSA) from the origin computes the earliest possible
+   arrival at every stop, honouring the minimum transfer time. If the
+   destination is unreachable we stop here.
+2. A round-based expansion (RAPTOR style, one round per extra leg) builds the
+   concrete itineraries with up to max_transfers changes. Partial journeys
+   arriving later than earliest arrival + max_wait are pruned, so the
+   expansion stays small.
+
+Itineraries are ranked by arrival time, then number of transfers, then
+price, and dominated ones (leave no later, arrive no earlier, cost and
+change more) are dropped.
+"""
+
+from datetime import timedelta
+
+
+class Itinerary:
+    __slots__ = ('legs',)
+
+    def __init__(self, legs):
+        self.legs = legs
+
+    @property
+    def departure_time(self):
+        return self.legs[0].departure_time
+
+    @property
+    def arrival_time(self):
+        return self.legs[-1].arrival_time
+
+    @property
+    def transfers(self):
+        return len(self.legs) - 1
+
+    @property
+    def total_price(self):
+        return sum(leg.price for leg in self.legs)
+
+    @property
+    def rank_key(self):
+        return (self.arrival_time, self.transfers, self.total_price, self.departure_time)
+
+    def dominates(self, other):
+        return (
+            self.departure_time >= other.departure_time
+            and self.arrival_time <= other.arrival_time
+            and self.transfers <= other.transfers
+            and self.total_price <= other.total_price
+        )
+
+    def to_dict(self):
+        return {
+            'departure_time': self.departure_time.isoformat(),
+            'arrival_time': self.arrival_time.isoformat(),
+            'duration_minutes': int((self.arrival_time - self.departure_time).total_seconds() // 60),
+            'transfers': self.transfers,
+            'total_price': self.total_price,
+            'available_seats': min(leg.available_seats for leg in self.legs),
+            'legs': [leg.to_dict() for leg in self.legs]
+        }
+
+
+def earliest_arrivals(connections, origins, start, min_transfer):
+    """
+    Connection Scan: earliest arrival time at each reachable stop.
+
+    Args:
+        connections: Departures sorted by departure time
+        origins: Set of origin stop keys
+        start: Earliest departure time from the origin
+        min_transfer: timedelta required between arriving and departing again
+    """
+    arrival = {stop: start for stop in origins}
+
+    for departure in connections:
+        reached = arrival.get(departure.origin_key)
+        if reached is None:
+            continue
+        ready = reached if departure.origin_key in origins else reached + min_transfer
+        if departure.departure_time < ready:
+            continue
+        best = arrival.get(departure.destination_key)
+        if best is None or departure.arrival_time < best:
+            arrival[departure.destination_key] = departure.arrival_time
+
+    return arrival
+
+
+def find_itineraries(view, origins, destinations, start, end, min_transfer=timedelta(minutes=30),
+                     max_transfers=2, max_wait=timedelta(hours=12), limit=5):
+    """
+    Find connecting itineraries with 1..max_transfers changes.
+
+    Args:
+        view: TimetableView to search
+        origins: Set of origin stop keys
+        destinations: Set of destination stop keys
+        start, end: Window for the first leg's departure
+        min_transfer: Minimum time between legs
+        max_transfers: Maximum number of changes (1 or 2)
+        max_wait: Longest acceptable wait at a transfer stop
+        limit: Maximum itineraries to return
+
+    Returns:
+        list: Ranked Itinerary objects
+    """
+    if not origins or not destinations or origins & destinations:
+        return []
+
+    # Bound the scan to the latest time a useful journey could still arrive
+    horizon = end + (max_transfers + 1) * max_wait
+    connections = [
+        departure for departure in view.departures(start, horizon)
+        if departure.available_seats > 0
+    ]
+
+    arrival = earliest_arrivals(connections, origins, start, min_transfer)
+    reachable = [arrival[stop] for stop in destinations if stop in arrival]
+    if not reachable:
+        return []
+    latest_useful = min(reachable) + max_wait
+
+    # Round 1: first legs out of the origin
+    partials = [
+        [departure] for departure in connections
+        if departure.origin_key in origins
+        and start <= departure.departure_time < end
+        and departure.destination_key not in destinations
+        and departure.arrival_time <= latest_useful
+    ]
+
+    found = []
+    for _ in range(max_transfers):
+        next_partials = []
+        for legs in partials:
+            last = legs[-1]
+            visited = {leg.origin_key for leg in legs} | {last.destination_key}
+            for departure in view.departures_from(
+                last.destination_key,
+                last.arrival_time + min_transfer,
+                last.arrival_time + max_wait
+            ):
+                if departure.available_seats <= 0 or departure.arrival_time > latest_useful:
+                    continue
+                if departure.destination_key in destinations:
+                    found.append(Itinerary(legs + [departure]))
+                elif departure.destination_key not in visited:
+                    next_partials.append(legs + [departure])
+        partials = next_partials
+
+    found.sort(key=lambda itinerary: itinerary.rank_key)
+
+    results = []
+    for itinerary in found:
+        if any(kept.dominates(itinerary) for kept in results):
+            continue
+        results.append(itinerary)
+        if len(results) >= limit:
+            break
+
+    return results
@@ -0,0 +1,179 @@
+"""
+In-process spatial index of stops.
+
+Stops with coordinates are bucketed into a fixed grid of
+STOP_GRID_CELL_DEGREES cells. A nearest-stops lookup scans rings of cells
+outwards from the query point and stops once the next ring can't hold
+anything closer than the k-th stop found (or lies beyond the radius), so
+only a handful of cells are ever visited. Columns wrap around the
+antimeridian and rows beyond the radius (or the k-th stop) are skipped, so
+lookups near the poles, where cells are only metres wide, stay bounded too.
+Distances are great-circle (haversine) kilometres; no external geo service
+is involved.
+
+The index is rebuilt lazily after a change to Stops is committed.
+"""
+
+import math
+import heapq
+import threading
+from collections import defaultdict, namedtuple
+from .change_events import subscribe
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Kilometres per degree of latitude (and of longitude at the equator)
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+GeoStop = namedtuple('GeoStop', ['id', 'name', 'latitude', 'longitude'])
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points, in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class StopLocator:
+    def __init__(self, cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+
+        # (grid of cell -> [GeoStop], stop count) swapped in as a whole on rebuild
+        self._data = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        from app.models import Stops
+
+        self.cell_degrees = app.config.get('STOP_GRID_CELL_DEGREES', self.cell_degrees)
+        app.extensions['stop_locator'] = self
+
+        subscribe(Stops, self._on_stop_changes)
+
+    def _on_stop_changes(self, changes):
+        self._stale = True
+
+    @property
+    def _columns(self):
+        # Cells around a full circle of longitude
+        return math.ceil(360 / self.cell_degrees)
+
+    def _cell(self, latitude, longitude):
+        # Columns wrap around the antimeridian
+        return (
+            math.floor(latitude / self.cell_degrees),
+            math.floor(longitude / self.cell_degrees) % self._columns
+        )
+
+    def rebuild(self):
+        """Rebuild the grid from the database. Needs an app context."""
+        from app import db
+        from app.models import Stops
+
+        with self._lock:
+            self._stale = False
+            grid = defaultdict(list)
+            count = 0
+            for row in db.session.query(Stops.id, Stops.name, Stops.latitude, Stops.longitude):
+                stop = GeoStop(*row)
+                grid[self._cell(stop.latitude, stop.longitude)].append(stop)
+                count += 1
+            self._data = (dict(grid), count)
+
+    def _current(self):
+        if self._data is None or self._stale:
+            self.rebuild()
+        return self._data
+
+    def nearest(self, latitude: float, longitude: float, k: int = 3, radius_km: float = None):
+        """
+        The k stops closest to a point, optionally within radius_km.
+
+        Returns:
+            list: (distance in km, GeoStop) tuples, nearest first
+        """
+        grid, count = self._current()
+        if not count:
+            return []
+
+        center_row, center_col = self._cell(latitude, longitude)
+        columns = self._columns
+        # Column offsets -west..east visit every column once, however close to a pole
+        west = columns // 2
+        east = columns - west - 1
+        # Rows are latitude bands: a row d rows away is at least (d - 1) * row_km away
+        row_km = self.cell_degrees * KM_PER_DEGREE
+        row_span = max(
+            center_row - math.floor(-90 / self.cell_degrees),
+            math.floor(90 / self.cell_degrees) - center_row
+        )
+        # A point d columns away is at least (d - 1) cells of longitude away, so
+        # no closer than that meridian's great circle (whatever its latitude)
+        cos_latitude = math.cos(math.radians(latitude))
+
+        def column_km(offset):
+            degrees = min(max(offset - 1, 0) * self.cell_degrees, 90)
+            return EARTH_RADIUS_KM * math.asin(min(1.0, cos_latitude * math.sin(math.radians(degrees))))
+
+        best = []  # max-heap on distance via negation
+        seen = 0
+        ring = 0
+        while True:
+            # Rows further out than the radius (or the k-th stop found) can't hold a match
+            limit_km = radius_km
+            if len(best) == k:
+                limit_km = -best[0][0] if limit_km is None else min(limit_km, -best[0][0])
+            rows = row_span if limit_km is None else min(row_span, math.floor(limit_km / row_km) + 1)
+
+            # Everything in this ring or further out is at least this far away
+            floors = []
+            if ring <= rows:
+                floors.append((ring - 1) * row_km)
+            if ring <= west:
+                floors.append(column_km(ring))
+            if not floors:
+                break
+            ring_floor = min(floors)
+            if limit_km is not None and ring_floor > limit_km:
+                break
+            if seen >= count and ring > 0:
+                break
+
+            for cell in self._ring_cells(center_row, center_col, ring, rows, west, east, columns):
+                for stop in grid.get(cell, ()):
+                    seen += 1
+                    distance = haversine_km(latitude, longitude, stop.latitude, stop.longitude)
+                    if radius_km is not None and distance > radius_km:
+                        continue
+                    entry = (-distance, -stop.id, stop)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+            ring += 1
+
+        return [(-distance, stop) for distance, _, stop in sorted(best, reverse=True)]
+
+    @staticmethod
+    def _ring_cells(center_row, center_col, ring, rows, west, east, columns):
+        # Cells ring steps away, within rows of the centre row; column offsets
+        # stop at the full longitude span so no cell is visited twice
+        if ring == 0:
+            yield (center_row, center_col)
+            return
+        if ring <= rows:
+            for offset in range(-min(ring, west), min(ring, east) + 1):
+                col = (center_col + offset) % columns
+                yield (center_row - ring, col)
+                yield (center_row + ring, col)
+        inner = min(ring - 1, rows)
+        for row in range(center_row - inner, center_row + inner + 1):
+            if ring <= west:
+                yield (row, (center_col - ring) % columns)
+            if ring <= east:
+                yield (row, (center_col + ring) % columns)
@@ -0,0 +1,228 @@
+"""
+Idempotency-Key support for write endpoints.
+
+Clients on unreliable networks retry requests whose response they never
+received. A request sent with an `Idempotency-Key` header is recorded per
+user in idempotency_keys together with a fingerprint of the request (method,
+path, body) and, once handled, its response. A retry with the same key
+gets the stored response back (with `Idempotent-Replayed: true`) without the
+view running again:
+
+- same key, different request  -> 422
+- same key, first request still being handled -> 409, for at most
+  IDEMPOTENCY_LEASE_MINUTES: a claim that is never completed or released
+  (its worker died) is then taken over and the retry runs
+- the first request failed with a 5xx or an exception -> the key is released
+  and the retry runs normally
+
+Stored responses are kept for IDEMPOTENCY_KEY_TTL hours. The most recent ones
+are also held in a per-process LRU (IDEMPOTENCY_CACHE_SIZE entries), so most
+retries are answered from memory without touching the database.
+"""
+
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone, timedelta
+from flask import request, current_app, abort, jsonify, Response
+from flask_login import current_user
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 100
+
+StoredResponse = namedtuple('StoredResponse', ['fingerprint', 'status_code', 'body', 'expires_at'])
+
+
+class IdempotencyStore:
+    def __init__(self, max_entries: int = 1024, ttl_hours: int = 24, lease_minutes: int = 5):
+        self.max_entries = max_entries
+        self.ttl_hours = ttl_hours
+        self.lease_minutes = lease_minutes
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned_at = None
+
+        self.replays = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('IDEMPOTENCY_CACHE_SIZE', self.max_entries)
+        self.ttl_hours = app.config.get('IDEMPOTENCY_KEY_TTL', self.ttl_hours)
+        self.lease_minutes = app.config.get('IDEMPOTENCY_LEASE_MINUTES', self.lease_minutes)
+        app.extensions['idempotency'] = self
+
+    # In-memory front
+
+    def _get_cached(self, cache_key, now):
+        with self._lock:
+            stored = self._entries.get(cache_key)
+            if stored is None:
+                return None
+            if stored.expires_at < now:
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return stored
+
+    def _put_cached(self, cache_key, stored):
+        with self._lock:
+            self._entries[cache_key] = stored
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    # Database store
+
+    def lookup(self, user_id, key, now):
+        """The stored response for (user_id, key), None if unknown; status_code None means in progress."""
+        from app.models import IdempotencyKeys
+
+        cache_key = (user_id, key)
+        stored = self._get_cached(cache_key, now)
+        if stored is not None:
+            return stored
+
+        row = IdempotencyKeys.query.filter_by(user_id=user_id, key=key).first()
+        if row is None:
+            return None
+        expires_at = _aware(row.expires_at)
+        if expires_at < now:
+            return None
+        stored = StoredResponse(row.fingerprint, row.status_code, row.response_body, expires_at)
+        if stored.status_code is not None:
+            self._put_cached(cache_key, stored)
+        return stored
+
+    def claim(self, user_id, key, fingerprint, now) -> bool:
+        """Record that a request with this key is being handled. False if someone else holds it."""
+        from app import db
+        from app.models import IdempotencyKeys
+        from sqlalchemy.exc import IntegrityError
+
+        self._prune(now)
+        # An expired record of the key (or a claim whose lease ran out) makes way for the new request
+        IdempotencyKeys.query.filter(
+            IdempotencyKeys.user_id == user_id,
+            IdempotencyKeys.key == key,
+            IdempotencyKeys.expires_at < now
+        ).delete(synchronize_session=False)
+        db.session.add(IdempotencyKeys(
+            key=key,
+            user_id=user_id,
+            fingerprint=fingerprint,
+            created_at=now,
+            # Only a lease while in progress; complete() extends it to the full TTL
+            expires_at=now + timedelta(minutes=self.lease_minutes)
+        ))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        return True
+
+    def complete(self, user_id, key, fingerprint, status_code, body, now):
+        """Store the response for a claimed key."""
+        from app import db
+        from app.models import IdempotencyKeys
+
+        expires_at = now + timedelta(hours=self.ttl_hours)
+        IdempotencyKeys.query.filter_by(user_id=user_id, key=key).update(
+            {'status_code': status_code, 'response_body': body, 'expires_at': expires_at},
+            synchronize_session=False
+        )
+        db.session.commit()
+        self._put_cached((user_id, key), StoredResponse(fingerprint, status_code, body, expires_at))
+
+    def release(self, user_id, key):
+        """Forget a claimed key so the request can be retried."""
+        from app import db
+        from app.models import IdempotencyKeys
+
+        db.session.rollback()
+        IdempotencyKeys.query.filter_by(user_id=user_id, key=key, status_code=None).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    def _prune(self, now):
+        # Drop expired records at most once an hour per process
+        from app.models import IdempotencyKeys
+
+        if self._pruned_at is not None and now - self._pruned_at < timedelta(hours=1):
+            return
+        self._pruned_at = now
+        IdempotencyKeys.query.filter(IdempotencyKeys.expires_at < now).delete(synchronize_session=False)
+
+
+def _aware(value):
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(b'\0')
+    digest.update(request.path.encode())
+    digest.update(b'\0')
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(stored):
+    response = Response(stored.body, status=stored.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Honour the Idempotency-Key header on a view. Place it below the role
+    decorators: keys are scoped to the logged-in user.
+    """
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(HEADER, '').strip()
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            abort(400, description=f'{HEADER} must be at most {MAX_KEY_LENGTH} characters')
+
+        store = current_app.extensions['idempotency']
+        user_id = current_user.id
+        fingerprint = _fingerprint()
+        now = datetime.now(timezone.utc)
+
+        stored = store.lookup(user_id, key, now)
+        if stored is None and not store.claim(user_id, key, fingerprint, now):
+            # Lost a race with a concurrent request using the same key
+            stored = store.lookup(user_id, key, now) or StoredResponse(fingerprint, None, None, now)
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                return jsonify({
+                    'error': 'Unprocessable Entity',
+                    'message': f'{HEADER} was already used for a different request'
+                }), 422
+            if stored.status_code is None:
+                return jsonify({
+                    'error': 'Conflict',
+                    'message': f'A request with this {HEADER} is still being processed'
+                }), 409
+            store.replays += 1
+            return _replay(stored)
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            store.release(user_id, key)
+            raise
+
+        if response.status_code >= 500:
+            store.release(user_id, key)
+        else:
+            store.complete(user_id, key, fingerprint, response.status_code, response.get_data(as_text=True), now)
+        return response
+
+    return decorated
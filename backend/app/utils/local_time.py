@@ -0,0 +1,114 @@
+"""
+Date and time helpers.
+
+Departure times are stored in UTC, but passengers and operators think in
+local (Malawi) days. A "travel day" is therefore turned into a half-open
+[start, end) UTC range on the raw column, which keeps the departure_time
+indexes usable instead of wrapping the column in DATE().
+"""
+
+import re
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from flask import current_app
+from sqlalchemy import func, literal_column
+from dateutil import parser as date_parser
+from datetime import datetime, date, time, timedelta, timezone
+
+DEFAULT_TIMEZONE = 'Africa/Blantyre'
+
+_DATE_ONLY = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+@lru_cache(maxsize=8)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+def local_timezone() -> ZoneInfo:
+    """Return the configured local timezone (TIMEZONE setting)."""
+    return _zone(current_app.config.get('TIMEZONE', DEFAULT_TIMEZONE))
+
+
+def parse_datetime_to_utc(datetime_string):
+    """
+    Parse datetime string to UTC timezone-aware datetime.
+    Accepts multiple formats:
+    - ISO 8601: "2024-03-15T14:30:00Z" or "2024-03-15T14:30:00+02:00"
+    - ISO without timezone: "2024-03-15T14:30:00" (assumes UTC)
+    - Date only: "2024-03-15" (assumes midnight UTC)
+    """
+    try:
+        # Use dateutil parser for flexible parsing
+        dt = date_parser.parse(datetime_string)
+
+        # If naive (no timezone), assume UTC
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        else:
+            # Convert to UTC
+            dt = dt.astimezone(timezone.utc)
+
+        return dt
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid datetime format: {datetime_string}. Expected ISO 8601 format.") from e
+
+
+def local_day_bounds(day: date, tz: ZoneInfo = None):
+    """
+    Return the UTC [start, end) range covering a local calendar day.
+
+    Args:
+        day: Local calendar date
+        tz: Timezone (defaults to the configured local timezone)
+
+    Returns:
+        tuple: (start, end) timezone-aware UTC datetimes
+    """
+    tz = tz or local_timezone()
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+def parse_date_bound(value: str, end: bool = False) -> datetime:
+    """
+    Parse a from/to filter value into a UTC datetime.
+
+    Date-only values ("2024-03-15") are local days: as a lower bound they mean
+    the start of that day, as an upper bound (end=True) the end of it, so the
+    whole day is included. Anything else is parsed with parse_datetime_to_utc.
+    """
+    value = value.strip()
+    if _DATE_ONLY.match(value):
+        try:
+            day = date.fromisoformat(value)
+        except ValueError as e:
+            raise ValueError(f"Invalid date: {value}") from e
+        start, stop = local_day_bounds(day)
+        return stop if end else start
+    return parse_datetime_to_utc(value)
+
+
+def local_date_expr(column, bind, at: datetime = None):
+    """
+    SQL expression for the local calendar date of a UTC datetime column,
+    for grouping rows by travel day.
+
+    PostgreSQL converts with the named zone. SQLite has no zone database, so
+    the UTC offset in effect at `at` (default: now) is applied; exact for
+    zones without daylight saving such as Africa/Blantyre.
+    """
+    tz = local_timezone()
+
+    if bind.dialect.name == 'postgresql':
+        # Inlined (zone keys are plain identifiers) so the expression is
+        # textually identical in SELECT and GROUP BY
+        return func.date(func.timezone(literal_column(f"'{tz.key}'"), column))
+
+    if bind.dialect.name == 'sqlite':
+        offset = (at or datetime.now(timezone.utc)).astimezone(tz).utcoffset()
+        minutes = int(offset.total_seconds() // 60)
+        return func.date(column, f'{minutes:+d} minutes')
+
+    return func.date(column)
@@ -0,0 +1,58 @@
+"""
+Substring-capable matching for route origins and destinations.
+
+A leading-wildcard ILIKE ('%lilo%') cannot use a b-tree index, so location
+search would scan the whole routes table. Each backend gets its own index:
+
+- PostgreSQL: pg_trgm GIN indexes on routes.origin / routes.destination.
+  The planner uses them for ILIKE '%x%' directly.
+- SQLite: an FTS5 table with the trigram tokenizer (routes_fts) that shadows
+  the routes table and is kept in sync by triggers. LIKE on its columns is
+  answered from the trigram index.
+
+Both are created by the "substring location index" migration.
+"""
+
+from sqlalchemy import inspect, table, column, select
+
+# Lightweight handle on the SQLite FTS5 shadow table
+routes_fts = table('routes_fts', column('rowid'), column('origin'), column('destination'))
+
+# engine -> whether routes_fts exists, checked once per engine
+_fts_available = {}
+
+
+def _sqlite_fts_available(bind) -> bool:
+    engine = getattr(bind, 'engine', bind)
+    if engine not in _fts_available:
+        try:
+            _fts_available[engine] = inspect(engine).has_table('routes_fts')
+        except Exception:
+            _fts_available[engine] = False
+    return _fts_available[engine]
+
+
+def location_match(column_attr, term: str, bind):
+    """
+    Build a case-insensitive substring filter for a Routes location column.
+
+    Args:
+        column_attr: Routes.origin or Routes.destination
+        term: User supplied (partial) location name
+        bind: Engine or connection the query will run on
+
+    Returns:
+        SQLAlchemy boolean clause
+    """
+    from app.models import Routes
+
+    pattern = f'%{term}%'
+
+    if bind.dialect.name == 'sqlite' and _sqlite_fts_available(bind):
+        fts_column = routes_fts.c[column_attr.key]
+        return Routes.id.in_(
+            select(routes_fts.c.rowid).where(fts_column.like(pattern))
+        )
+
+    # PostgreSQL answers this from the pg_trgm GIN index; other backends scan
+    return column_attr.ilike(pattern)
@@ -1,10 +1,34 @@
 import io
 import qrcode
 import logging
+import threading
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
 
 logger = logging.getLogger(__name__)
 
+_font_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def _fonts():
+    """(title font, text font), loaded from disk once per process."""
+    try:
+        font_title = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 16)
+        font_text = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 12)
+        logger.info("Successfully loaded TrueType fonts for QR code")
+    except Exception as e:
+        logger.warning(f"Could not load TrueType fonts, using default: {str(e)}")
+        # Use default font with size parameter for Pillow 10+
+        try:
+            font_title = ImageFont.load_default(size=16)
+            font_text = ImageFont.load_default(size=12)
+        except TypeError:
+            # Fallback for older Pillow versions
+            font_title = ImageFont.load_default()
+            font_text = ImageFont.load_default()
+    return font_title, font_text
+
 
 def generate_qr_code_image(qr_reference: str, booking_info: dict) -> io.BytesIO:
     """
@@ -47,46 +71,32 @@ def generate_qr_code_image(qr_reference: str, booking_info: dict) -> io.BytesIO:
     # Add text information below QR code
     draw = ImageDraw.Draw(final_img)
     
-    # Try to use a better font, fallback to default
-    font_title = None
-    font_text = None
-    try:
-        font_title = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 16)
-        font_text = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 12)
-        logger.info("Successfully loaded TrueType fonts for QR code")
-    except Exception as e:
-        logger.warning(f"Could not load TrueType fonts, using default: {str(e)}")
-        # Use default font with size parameter for Pillow 10+
-        try:
-            font_title = ImageFont.load_default(size=16)
-            font_text = ImageFont.load_default(size=12)
-        except TypeError:
-            # Fallback for older Pillow versions
-            font_title = ImageFont.load_default()
-            font_text = ImageFont.load_default()
-    
-    # Add text
-    y_offset = height + 10
-    
-    # Title
-    title = "ULENDO TIKETI"
-    title_bbox = draw.textbbox((0, 0), title, font=font_title)
-    title_width = title_bbox[2] - title_bbox[0]
-    draw.text(((width - title_width) // 2, y_offset), title, fill='black', font=font_title)
-    y_offset += 25
+    # Fonts are shared by all threads; FreeType faces must not be used concurrently
+    font_title, font_text = _fonts()
     
-    # Booking details
-    details = [
-        f"Booking: {booking_info.get('booking_id')}",
-        f"Route: {booking_info.get('route')}",
-        f"Date: {booking_info.get('departure_date')}"
-    ]
-    
-    for detail in details:
-        detail_bbox = draw.textbbox((0, 0), detail, font=font_text)
-        detail_width = detail_bbox[2] - detail_bbox[0]
-        draw.text(((width - detail_width) // 2, y_offset), detail, fill='black', font=font_text)
-        y_offset += 18
+    with _font_lock:
+        # Add text
+        y_offset = height + 10
+        
+        # Title
+        title = "ULENDO TIKETI"
+        title_bbox = draw.textbbox((0, 0), title, font=font_title)
+        title_width = title_bbox[2] - title_bbox[0]
+        draw.text(((width - title_width) // 2, y_offset), title, fill='black', font=font_title)
+        y_offset += 25
+        
+        # Booking details
+        details = [
+            f"Booking: {booking_info.get('booking_id')}",
+            f"Route: {booking_info.get('route')}",
+            f"Date: {booking_info.get('departure_date')}"
+        ]
+        
+        for detail in details:
+            detail_bbox = draw.textbbox((0, 0), detail, font=font_text)
+            detail_width = detail_bbox[2] - detail_bbox[0]
+            draw.text(((width - detail_width) // 2, y_offset), detail, fill='black', font=font_text)
+            y_offset += 18
     
     # Save to BytesIO
     img_io = io.BytesIO()
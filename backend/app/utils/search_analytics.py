@@ -0,0 +1,180 @@
+"""
+Search telemetry.
+
+Every schedule search is normalized and appended to an in-memory ring buffer;
+nothing touches the database on the request path. A background thread drains
+the buffer every SEARCH_ANALYTICS_FLUSH_INTERVAL seconds and bulk-inserts the
+events into search_events. If the buffer fills up faster than it is flushed,
+the oldest events are dropped (and counted) rather than slowing searches down.
+
+Alongside the log, rolling per-minute counts of origin/destination pairs over
+the last SEARCH_ANALYTICS_WINDOW seconds are kept in memory, so other parts
+of the app (cache warming) can ask what is popular right now without a query.
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import deque, Counter
+from datetime import datetime, timezone
+from .stop_index import normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Width of one popularity bucket, in seconds
+BUCKET_SECONDS = 60
+
+# Sizes of the search_events text columns; longer input is cut to fit so one
+# odd search can't make the whole batch insert fail
+ORIGIN_LENGTH = 100
+DESTINATION_LENGTH = 100
+SORT_LENGTH = 20
+
+
+class SearchAnalytics:
+    def __init__(self, buffer_size: int = 10000, flush_interval: float = 5, window: int = 3600):
+        self.enabled = True
+        self.flush_interval = flush_interval
+        self.window = window
+        self.batch_size = 500
+
+        self._buffer = deque(maxlen=buffer_size)
+        # (bucket start, Counter of (origin, destination)) oldest first
+        self._buckets = deque()
+        self._lock = threading.Lock()
+
+        self._app = None
+        self._worker = None
+        self._worker_pid = None
+        self._wake = threading.Event()
+
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SEARCH_ANALYTICS_ENABLED', True)
+        self.flush_interval = app.config.get('SEARCH_ANALYTICS_FLUSH_INTERVAL', self.flush_interval)
+        self.window = app.config.get('SEARCH_ANALYTICS_WINDOW', self.window)
+        buffer_size = app.config.get('SEARCH_ANALYTICS_BUFFER_SIZE', self._buffer.maxlen)
+        if buffer_size != self._buffer.maxlen:
+            self._buffer = deque(maxlen=buffer_size)
+
+        self._app = app
+        app.extensions['search_analytics'] = self
+
+        # Don't lose what's still buffered on a clean shutdown
+        atexit.register(self._flush_at_exit)
+
+    # Recording
+
+    def record(self, origin: str, destination: str, travel_date=None, sort: str = None, result_count: int = None):
+        """Log one search. Cheap and non-blocking; safe to call on the request path."""
+        if not self.enabled:
+            return
+
+        origin = normalize_name(origin)[:ORIGIN_LENGTH]
+        destination = normalize_name(destination)[:DESTINATION_LENGTH]
+        if sort is not None:
+            sort = sort[:SORT_LENGTH]
+        now = datetime.now(timezone.utc)
+
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append({
+            'origin': origin,
+            'destination': destination,
+            'travel_date': travel_date,
+            'sort': sort,
+            'result_count': result_count,
+            'searched_at': now
+        })
+        self.recorded += 1
+
+        with self._lock:
+            self._count(origin, destination, time.time())
+
+        self._ensure_worker()
+        # Flush early rather than let a burst overrun the buffer
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _count(self, origin, destination, now):
+        bucket_start = int(now // BUCKET_SECONDS) * BUCKET_SECONDS
+        if not self._buckets or self._buckets[-1][0] != bucket_start:
+            self._buckets.append((bucket_start, Counter()))
+        self._buckets[-1][1][(origin, destination)] += 1
+        self._expire(now)
+
+    def _expire(self, now):
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+    def popular_pairs(self, limit: int = 10):
+        """
+        Most searched origin/destination pairs over the rolling window.
+
+        Returns:
+            list: ((origin, destination), count) tuples, most searched first
+        """
+        with self._lock:
+            self._expire(time.time())
+            totals = Counter()
+            for _, counts in self._buckets:
+                totals.update(counts)
+        return totals.most_common(limit)
+
+    # Flushing
+
+    def _ensure_worker(self):
+        # Started lazily so each forked worker process gets its own thread
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='search-analytics', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception:
+                logger.exception('Failed to flush search events')
+
+    def flush(self):
+        """Write buffered events to search_events. Needs an app context."""
+        from app import db
+        from app.models import SearchEvents
+        from sqlalchemy import insert
+
+        while self._buffer:
+            batch = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+
+            try:
+                db.session.execute(insert(SearchEvents), batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Telemetry is best effort: drop the batch instead of retrying forever
+                self.dropped += len(batch)
+                raise
+            self.flushed += len(batch)
+
+    def _flush_at_exit(self):
+        if not self._buffer or self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception:
+            logger.exception('Failed to flush search events at exit')
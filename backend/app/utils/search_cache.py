@@ -0,0 +1,143 @@
+"""
+In-process result cache for schedule search.
+
+Entries are keyed on the normalized search parameters and evicted LRU-first
+or after a short TTL. Each entry remembers the routes its query matched and
+the version of each of those routes at the time it was filled. Committing a
+change to a schedule bumps the version of its route, so the next lookup
+sees a stale version and falls through to the database.
+
+The cache is per process; the TTL bounds how long a change committed by
+another worker can go unnoticed.
+"""
+
+import time
+import threading
+from collections import OrderedDict, defaultdict
+from .change_events import subscribe
+
+# Company columns that show up in (or filter) search results
+_COMPANY_FIELDS = {'name', 'description', 'status'}
+
+
+class SearchCache:
+    def __init__(self, max_entries: int = 512, ttl: float = 30):
+        self.enabled = True
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._route_versions = defaultdict(int)
+        # Bumped when routes, buses or companies change; invalidates everything
+        self._catalog_version = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        from app.models import Schedules, Routes, Buses, BusCompanies
+
+        self.enabled = app.config.get('SEARCH_CACHE_ENABLED', True)
+        self.max_entries = app.config.get('SEARCH_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('SEARCH_CACHE_TTL', self.ttl)
+        app.extensions['search_cache'] = self
+
+        subscribe(Schedules, self._on_schedule_changes)
+        subscribe(Routes, self._on_catalog_changes)
+        subscribe(Buses, self._on_catalog_changes)
+        subscribe(BusCompanies, self._on_company_changes)
+
+    @staticmethod
+    def make_key(*parts):
+        """Normalize search parameters into a hashable key."""
+        key = []
+        for part in parts:
+            if isinstance(part, str):
+                part = ' '.join(part.split()).casefold()
+            elif isinstance(part, float):
+                part = round(part, 2)
+            elif hasattr(part, 'isoformat'):
+                part = part.isoformat()
+            key.append(part)
+        return tuple(key)
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or stale."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, catalog_version, versions, value = entry
+            stale = (
+                expires_at < time.monotonic()
+                or catalog_version != self._catalog_version
+                or any(self._route_versions[route_id] != version for route_id, version in versions)
+            )
+            if stale:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def version_token(self, route_ids):
+        """
+        Snapshot the current versions of route_ids.
+
+        Take the snapshot before running the query and pass it to set(), so a
+        change committed while the query runs is not masked by the new entry.
+        """
+        with self._lock:
+            return self._catalog_version, tuple((route_id, self._route_versions[route_id]) for route_id in route_ids)
+
+    def set(self, key, value, token):
+        if not self.enabled:
+            return
+
+        catalog_version, versions = token
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, catalog_version, versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump_routes(self, route_ids):
+        with self._lock:
+            for route_id in route_ids:
+                self._route_versions[route_id] += 1
+
+    def clear(self):
+        with self._lock:
+            self._catalog_version += 1
+            self._entries.clear()
+
+    def _on_schedule_changes(self, changes):
+        route_ids = set()
+        for change in changes:
+            if change.values.get('route_id') is not None:
+                route_ids.add(change.values['route_id'])
+            if change.previous.get('route_id') is not None:
+                route_ids.add(change.previous['route_id'])
+        if route_ids:
+            self.bump_routes(route_ids)
+        else:
+            # Not enough information to target specific routes
+            self.clear()
+
+    def _on_catalog_changes(self, changes):
+        self.clear()
+
+    def _on_company_changes(self, changes):
+        # Balance updates (one per confirmed payment) don't affect results
+        for change in changes:
+            if change.op != 'update' or _COMPANY_FIELDS & change.previous.keys():
+                self.clear()
+                return
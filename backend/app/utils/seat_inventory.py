@@ -0,0 +1,346 @@
+"""
+Per-seat inventory for schedules.
+
+Every schedule has one schedule_seats row per seat, created together with
+the schedule. Booking claims specific seat rows instead of serializing on
+the schedule row:
+
+1. Pick free seats with SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL), so
+   concurrent bookers skip seats someone else is claiming instead of
+   waiting for them.
+2. Claim them with one conditional UPDATE (... AND status = 'available').
+   SQLite has no row locks, so there the condition is what settles races:
+   if another transaction got a seat first, fewer rows are updated, our
+   claims are undone and the pick is retried.
+
+The (schedule_id, seat_number) unique constraint makes double-booking a
+seat impossible. Schedules.available_seats is kept as a counter for search
+and is adjusted by the caller with a relative update.
+
+Seats for a pending booking are only held, until held_until. Payment turns
+the hold into a booked seat (confirm_seats); holds that run out are given
+back by release_expired_holds(), which also cancels their bookings and
+restores the seat counters. That and cancel_abandoned_bookings() are
+set-based: their cost doesn't grow with the number of rows swept. On
+PostgreSQL each is a single statement (data-modifying CTEs feeding one
+UPDATE schedules ... FROM the per-schedule counts); elsewhere the counts are
+read first and applied with one CASE update, which is safe because SQLite
+serializes writers.
+
+Schedules created before the inventory existed (and already departed at
+migration time) have no seat rows; has_inventory() tells callers to use the
+plain counter for those. take_seats() books against the counter alone with
+one conditional decrement; it is also the whole of the "counter" booking
+strategy (BOOKING_SEAT_STRATEGY), which leaves the seat rows untouched.
+take_seats_locked() is the lock-check-mutate path it replaced, kept as the
+"locked" strategy so benchmark_booking.py has a baseline to measure against.
+"""
+
+from app import db
+from datetime import datetime, timezone
+from sqlalchemy import update, case, insert, select, func
+from app.models import ScheduleSeats, Schedules, Bookings
+from .change_events import record_change
+
+SEAT_AVAILABLE = 'available'
+SEAT_HELD = 'held'
+SEAT_BOOKED = 'booked'
+
+# Retries when a concurrent booker wins the race for a picked seat (SQLite)
+MAX_ATTEMPTS = 5
+
+
+class SeatUnavailableError(Exception):
+    """Not enough free seats (or the requested seat is taken)."""
+
+
+def create_seats(schedule_id: int, count: int):
+    """Add seats 1..count for a new schedule (bulk insert, part of the caller's transaction)."""
+    if count <= 0:
+        return
+    db.session.execute(insert(ScheduleSeats), [
+        {'schedule_id': schedule_id, 'seat_number': str(number), 'status': SEAT_AVAILABLE}
+        for number in range(1, count + 1)
+    ])
+
+
+def delete_seats(schedule_id: int):
+    db.session.execute(
+        ScheduleSeats.__table__.delete().where(ScheduleSeats.schedule_id == schedule_id)
+    )
+
+
+def has_inventory(schedule_id: int) -> bool:
+    return db.session.query(
+        db.session.query(ScheduleSeats.id).filter_by(schedule_id=schedule_id).exists()
+    ).scalar()
+
+
+def take_seats(schedule_id: int, count: int = 1) -> bool:
+    """
+    Decrement the seat counter by count if at least count seats are left.
+
+    One conditional UPDATE ... WHERE available_seats >= count RETURNING, so
+    the check and the decrement are atomic and no row lock is held past the
+    statement. Part of the caller's transaction.
+
+    Returns:
+        bool: False if there weren't enough seats (nothing changed)
+    """
+    schedules = Schedules.__table__
+    row = db.session.execute(
+        update(schedules)
+        .where(schedules.c.id == schedule_id, schedules.c.available_seats >= count)
+        .values(available_seats=schedules.c.available_seats - count)
+        .returning(schedules.c.route_id)
+    ).first()
+    if row is None:
+        return False
+    record_change(db.session, Schedules, 'update', schedule_id, values={'route_id': row.route_id})
+    return True
+
+
+def take_seats_locked(schedule: Schedules, count: int = 1) -> bool:
+    """
+    Decrement a loaded schedule's seat counter by count under a row lock.
+
+    SELECT ... FOR UPDATE, a check in Python, then the update: concurrent
+    bookers queue on the schedule row until this transaction ends. The lock
+    is ignored by SQLite. Part of the caller's transaction.
+
+    Returns:
+        bool: False if there weren't enough seats (nothing changed)
+    """
+    db.session.refresh(schedule, with_for_update=True)
+    if schedule.available_seats < count:
+        return False
+    schedule.available_seats -= count
+    return True
+
+
+def adjust_seat_count(schedule: Schedules, delta: int):
+    """
+    Move a loaded schedule's seat counter by delta with a relative update.
+
+    The attribute is assigned a SQL expression and expires on flush, so the
+    session no longer sees it as modified; the change is recorded here so the
+    search caches still hear about it.
+    """
+    schedule.available_seats = Schedules.available_seats + delta
+    record_change(db.session, Schedules, 'update', schedule.id, values={'route_id': schedule.route_id})
+
+
+def allocate_seats(schedule_id: int, booking_ids, seat_number: str = None, hold_until: datetime = None):
+    """
+    Claim one seat per booking id.
+
+    Args:
+        schedule_id: Schedule to book on
+        booking_ids: Ids of the (flushed) bookings the seats are for
+        seat_number: Specific seat wanted (single booking only)
+        hold_until: Hold the seats until then instead of booking them outright
+
+    Returns:
+        list: Seat numbers, in booking_ids order
+
+    Raises:
+        SeatUnavailableError: If there aren't enough free seats or seat_number is taken
+    """
+    booking_ids = list(booking_ids)
+    count = len(booking_ids)
+
+    for _ in range(MAX_ATTEMPTS):
+        query = db.session.query(ScheduleSeats.id, ScheduleSeats.seat_number).filter(
+            ScheduleSeats.schedule_id == schedule_id,
+            ScheduleSeats.status == SEAT_AVAILABLE
+        )
+        if seat_number is not None:
+            query = query.filter(ScheduleSeats.seat_number == str(seat_number))
+
+        # Ignored by SQLite, which serializes writers anyway
+        candidates = query.order_by(ScheduleSeats.id).limit(count).with_for_update(skip_locked=True).all()
+        if len(candidates) < count:
+            raise SeatUnavailableError(
+                f'Seat {seat_number} is not available' if seat_number is not None else 'Not enough available seats'
+            )
+
+        seat_ids = [seat_id for seat_id, _ in candidates]
+        assignments = dict(zip(seat_ids, booking_ids))
+        result = db.session.execute(
+            update(ScheduleSeats)
+            .where(ScheduleSeats.id.in_(seat_ids), ScheduleSeats.status == SEAT_AVAILABLE)
+            .values(
+                status=SEAT_HELD if hold_until else SEAT_BOOKED,
+                booking_id=case(assignments, value=ScheduleSeats.id),
+                held_until=hold_until
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == count:
+            return [number for _, number in candidates]
+
+        # Lost some of them to a concurrent booker: give back what we got and pick again
+        release_seats(booking_ids)
+
+    raise SeatUnavailableError('Seats are in high demand, please try again')
+
+
+def release_seats(booking_ids) -> int:
+    """Return the seats held by these bookings to the inventory. Returns the number released."""
+    booking_ids = list(booking_ids)
+    if not booking_ids:
+        return 0
+    result = db.session.execute(
+        update(ScheduleSeats)
+        .where(ScheduleSeats.booking_id.in_(booking_ids))
+        .values(status=SEAT_AVAILABLE, booking_id=None, held_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def confirm_seats(booking_ids):
+    """
+    Turn the held seats of paid bookings into booked seats.
+
+    Returns:
+        set: Ids among booking_ids that have no seat (their hold ran out and the
+        seat was given back), for the caller to allocate again
+    """
+    booking_ids = set(booking_ids)
+    if not booking_ids:
+        return set()
+    db.session.execute(
+        update(ScheduleSeats)
+        .where(ScheduleSeats.booking_id.in_(booking_ids), ScheduleSeats.status == SEAT_HELD)
+        .values(status=SEAT_BOOKED, held_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    seated = db.session.query(ScheduleSeats.booking_id).filter(
+        ScheduleSeats.booking_id.in_(booking_ids),
+        ScheduleSeats.status == SEAT_BOOKED
+    ).distinct()
+    return booking_ids - {booking_id for booking_id, in seated}
+
+
+def release_expired_holds(schedule_id: int = None, now: datetime = None) -> int:
+    """
+    Give back seats whose hold has run out, cancel their pending bookings and
+    restore the seat counters. Part of the caller's transaction.
+
+    Args:
+        schedule_id: Only this schedule (default: all schedules)
+        now: Expiry reference time (default: now)
+
+    Returns:
+        int: Number of seats released
+    """
+    now = now or datetime.now(timezone.utc)
+    seats = ScheduleSeats.__table__
+    bookings = Bookings.__table__
+
+    expired = [seats.c.status == SEAT_HELD, seats.c.held_until < now]
+    if schedule_id is not None:
+        expired.append(seats.c.schedule_id == schedule_id)
+    free = {'status': SEAT_AVAILABLE, 'booking_id': None, 'held_until': None}
+    cancel = {'status': 'cancelled', 'cancelled_at': now}
+
+    if _dml_in_cte():
+        freed = update(seats).where(*expired).values(free).returning(
+            seats.c.schedule_id, seats.c.booking_id
+        ).cte('freed')
+        cancelled = update(bookings).where(
+            bookings.c.id.in_(select(freed.c.booking_id)), bookings.c.status == 'pending'
+        ).values(cancel).returning(bookings.c.id).cte('cancelled')
+        counts = select(
+            freed.c.schedule_id, func.count().label('seats')
+        ).group_by(freed.c.schedule_id).subquery('counts')
+        return _restore_from(counts, cancelled)
+
+    counts = db.session.execute(
+        select(seats.c.schedule_id, func.count()).where(*expired).group_by(seats.c.schedule_id)
+    ).all()
+    if not counts:
+        return 0
+    db.session.execute(
+        update(bookings).where(
+            bookings.c.id.in_(select(seats.c.booking_id).where(*expired)), bookings.c.status == 'pending'
+        ).values(cancel)
+    )
+    db.session.execute(update(seats).where(*expired).values(free))
+    return _restore(counts)
+
+
+def cancel_abandoned_bookings(cutoff: datetime, now: datetime = None) -> int:
+    """
+    Cancel bookings still pending since before cutoff, give back their seats
+    and restore the seat counters. Part of the caller's transaction.
+
+    Returns:
+        int: Number of bookings cancelled
+    """
+    now = now or datetime.now(timezone.utc)
+    seats = ScheduleSeats.__table__
+    bookings = Bookings.__table__
+
+    stale = [bookings.c.status == 'pending', bookings.c.created_at < cutoff]
+    free = {'status': SEAT_AVAILABLE, 'booking_id': None, 'held_until': None}
+    cancel = {'status': 'cancelled', 'cancelled_at': now}
+
+    if _dml_in_cte():
+        cancelled = update(bookings).where(*stale).values(cancel).returning(
+            bookings.c.id, bookings.c.schedule_id
+        ).cte('cancelled')
+        freed = update(seats).where(
+            seats.c.booking_id.in_(select(cancelled.c.id))
+        ).values(free).returning(seats.c.id).cte('freed')
+        counts = select(
+            cancelled.c.schedule_id, func.count().label('seats')
+        ).group_by(cancelled.c.schedule_id).subquery('counts')
+        return _restore_from(counts, freed)
+
+    counts = db.session.execute(
+        select(bookings.c.schedule_id, func.count()).where(*stale).group_by(bookings.c.schedule_id)
+    ).all()
+    if not counts:
+        return 0
+    db.session.execute(
+        update(seats).where(seats.c.booking_id.in_(select(bookings.c.id).where(*stale))).values(free)
+    )
+    db.session.execute(update(bookings).where(*stale).values(cancel))
+    return _restore(counts)
+
+
+def _dml_in_cte() -> bool:
+    # INSERT/UPDATE ... RETURNING inside WITH is PostgreSQL-only
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def _restore_from(counts, *ctes) -> int:
+    """UPDATE schedules ... FROM counts (schedule_id, seats), running ctes in the same statement."""
+    schedules = Schedules.__table__
+    statement = update(schedules).where(schedules.c.id == counts.c.schedule_id).values(
+        available_seats=schedules.c.available_seats + counts.c.seats
+    ).returning(schedules.c.id, schedules.c.route_id, counts.c.seats)
+    for cte in ctes:
+        statement = statement.add_cte(cte)
+    return _publish(db.session.execute(statement).all())
+
+
+def _restore(counts) -> int:
+    """Add seats back from (schedule_id, seats) pairs with one CASE update."""
+    schedules = Schedules.__table__
+    counts = dict(counts)
+    rows = db.session.execute(
+        update(schedules).where(schedules.c.id.in_(counts)).values(
+            available_seats=schedules.c.available_seats + case(counts, value=schedules.c.id)
+        ).returning(schedules.c.id, schedules.c.route_id)
+    ).all()
+    return _publish([(schedule_id, route_id, counts[schedule_id]) for schedule_id, route_id in rows])
+
+
+def _publish(rows) -> int:
+    # Core statements bypass the ORM events, so tell the search caches directly
+    for schedule_id, route_id, _ in rows:
+        record_change(db.session, Schedules, 'update', schedule_id, values={'route_id': route_id})
+    return sum(seats for _, _, seats in rows)
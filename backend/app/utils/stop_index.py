@@ -0,0 +1,221 @@
+"""
+Process-local index of stop names for typeahead.
+
+Distinct Routes.origin / Routes.destination names are kept in a sorted array
+of normalized keys (one entry per word start, so "city" finds "Mzuzu City"),
+weighted by how many bookings touch the stop. A prefix lookup is two binary
+searches plus a top-k pick over the matching slice; no database access.
+
+For typo tolerance the same stops are also kept in a BK-tree keyed on
+Levenshtein distance, so resolving "Blantire" to "Blantyre" only compares
+against the few names that can be within the edit-distance budget.
+
+The index is rebuilt lazily after a route change is committed, or once it is
+older than STOP_INDEX_MAX_AGE so popularity stays reasonably current.
+"""
+
+import time
+import heapq
+import bisect
+import threading
+from .change_events import subscribe
+
+
+def normalize_name(name: str) -> str:
+    return ' '.join(name.split()).casefold()
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between a and b."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """Burkhard-Keller tree over (key, stop id) pairs for edit-distance lookups."""
+
+    def __init__(self):
+        # Nodes are (key, stop id, {distance: child node})
+        self._root = None
+
+    def add(self, key: str, stop_id: int):
+        if self._root is None:
+            self._root = (key, stop_id, {})
+            return
+        node = self._root
+        while True:
+            distance = edit_distance(key, node[0])
+            if distance == 0:
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (key, stop_id, {})
+                return
+            node = child
+
+    def search(self, key: str, max_distance: int):
+        """
+        Returns:
+            list: (distance, stop id) for every key within max_distance of key
+        """
+        matches = []
+        pending = [self._root] if self._root is not None else []
+        while pending:
+            node_key, stop_id, children = pending.pop()
+            distance = edit_distance(key, node_key)
+            if distance <= max_distance:
+                matches.append((distance, stop_id))
+            # Triangle inequality: only subtrees in this band can hold matches
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    pending.append(child)
+        return matches
+
+
+class StopIndex:
+    def __init__(self, max_age: int = 3600, max_distance: int = 2):
+        self.max_age = max_age
+        self.max_distance = max_distance
+
+        # (keys, stop ids, names, weights, BK-tree) swapped in as a whole on rebuild,
+        # so readers never see a half-built index
+        self._data = None
+        self._built_at = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        from app.models import Routes
+
+        self.max_age = app.config.get('STOP_INDEX_MAX_AGE', self.max_age)
+        self.max_distance = app.config.get('STOP_MATCH_MAX_DISTANCE', self.max_distance)
+        app.extensions['stop_index'] = self
+
+        subscribe(Routes, self._on_route_changes)
+
+    def _on_route_changes(self, changes):
+        self._stale = True
+
+    def _load_stops(self):
+        """Return {display name: booking count} for every stop. Needs an app context."""
+        from app import db
+        from app.models import Routes, Schedules, Bookings
+        from sqlalchemy import func
+
+        weights = {}
+        for origin, destination in db.session.query(Routes.origin, Routes.destination):
+            weights.setdefault(origin, 0)
+            weights.setdefault(destination, 0)
+
+        popularity = db.session.query(
+            Routes.origin, Routes.destination, func.count(Bookings.id)
+        ).select_from(Bookings).join(Schedules).join(Routes).filter(
+            Bookings.status.in_(['confirmed', 'boarded'])
+        ).group_by(Routes.origin, Routes.destination)
+
+        for origin, destination, count in popularity:
+            weights[origin] = weights.get(origin, 0) + count
+            weights[destination] = weights.get(destination, 0) + count
+
+        return weights
+
+    def rebuild(self):
+        """Rebuild the index from the database. Needs an app context."""
+        with self._lock:
+            # Cleared first so a change committed during the load marks it stale again
+            self._stale = False
+            weights = self._load_stops()
+
+            # Merge spellings that only differ in case/spacing
+            stops = {}
+            for name, weight in weights.items():
+                key = normalize_name(name)
+                if key in stops:
+                    stops[key] = (stops[key][0], stops[key][1] + weight)
+                else:
+                    stops[key] = (name.strip(), weight)
+
+            names = []
+            stop_weights = []
+            entries = []
+            tree = BKTree()
+            for stop_id, (key, (name, weight)) in enumerate(sorted(stops.items())):
+                names.append(name)
+                stop_weights.append(weight)
+                tree.add(key, stop_id)
+                words = key.split(' ')
+                for i in range(len(words)):
+                    entries.append((' '.join(words[i:]), stop_id))
+            entries.sort()
+
+            self._data = (
+                [entry[0] for entry in entries],
+                [entry[1] for entry in entries],
+                names,
+                stop_weights,
+                tree
+            )
+            self._built_at = time.monotonic()
+
+    def _current(self):
+        if self._data is None or self._stale or time.monotonic() - self._built_at > self.max_age:
+            self.rebuild()
+        return self._data
+
+    def suggest(self, prefix: str, limit: int = 8):
+        """
+        Stops with a word starting with prefix, most booked first.
+
+        Returns:
+            list: (name, weight) tuples
+        """
+        keys, stop_ids, names, weights, _ = self._current()
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+
+        low = bisect.bisect_left(keys, prefix)
+        high = bisect.bisect_left(keys, prefix + '\uffff', low)
+        matches = set(stop_ids[low:high])
+
+        best = heapq.nsmallest(limit, matches, key=lambda stop_id: (-weights[stop_id], names[stop_id]))
+        return [(names[stop_id], weights[stop_id]) for stop_id in best]
+
+    def resolve(self, text: str):
+        """
+        Closest known stop name for text that doesn't match any stop as typed.
+
+        Text that already appears in a stop name (ignoring case) is left alone
+        and None is returned. Otherwise the whole text, then each of its words,
+        is looked up within an edit-distance budget that grows with its length
+        (at most STOP_MATCH_MAX_DISTANCE); the nearest, most booked stop wins.
+        "Blantire" gives "Blantyre", "Mzuzu city" gives "Mzuzu".
+
+        Returns:
+            str: Canonical stop name, or None if there is nothing to correct
+        """
+        _, _, names, weights, tree = self._current()
+        text = normalize_name(text)
+        if not text or any(text in normalize_name(name) for name in names):
+            return None
+
+        for candidate in [text] + sorted(set(text.split(' ')) - {text}, key=len, reverse=True):
+            budget = min(self.max_distance, len(candidate) // 4)
+            if budget < 1:
+                continue
+            matches = tree.search(candidate, budget)
+            if matches:
+                distance, stop_id = min(matches, key=lambda match: (match[0], -weights[match[1]], names[match[1]]))
+                return names[stop_id]
+        return None
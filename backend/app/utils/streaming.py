@@ -0,0 +1,37 @@
+"""
+Newline-delimited JSON streaming for large listings.
+
+Clients opt in with "Accept: application/x-ndjson". Rows are fetched from
+the database in batches (yield_per) and each one is written to the response
+as soon as it is serialized, so memory stays flat regardless of result size
+and the first rows reach the client before the query finishes.
+"""
+
+import json
+from flask import Response, request, current_app, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson() -> bool:
+    """True if the client prefers NDJSON over regular JSON."""
+    accept = request.accept_mimetypes
+    return accept[NDJSON_MIMETYPE] > accept['application/json']
+
+
+def ndjson_response(query, serialize, status: int = 200) -> Response:
+    """
+    Stream a query as NDJSON.
+
+    Args:
+        query: SQLAlchemy query; rows are fetched STREAM_BATCH_SIZE at a time
+        serialize: Callable turning one row into a JSON-serializable dict
+        status: HTTP status code
+    """
+    batch_size = current_app.config.get('STREAM_BATCH_SIZE', 200)
+
+    def generate():
+        for row in query.yield_per(batch_size):
+            yield json.dumps(serialize(row), separators=(',', ':')) + '\n'
+
+    return Response(stream_with_context(generate()), status=status, mimetype=NDJSON_MIMETYPE)
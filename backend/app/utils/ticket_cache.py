@@ -0,0 +1,159 @@
+"""
+Cache of rendered ticket (QR code) images.
+
+A booking's ticket image only depends on its QR reference and the few trip
+details printed under the code, so it is rendered once and kept as a PNG
+under QR_CACHE_FOLDER (shared by all workers and kept across restarts), with
+the most recently served images also held in a per-process LRU of
+QR_CACHE_SIZE entries. Files are named after the QR reference plus a digest
+of the printed details, so a rescheduled trip gets a fresh image.
+
+Confirmed bookings are pre-rendered in a background thread right after the
+payment is confirmed, so the first download is already a cache hit.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+def ticket_info(booking_id, origin, destination, departure_time) -> dict:
+    """The details printed under the QR code."""
+    return {
+        'booking_id': booking_id,
+        'route': f"{origin} to {destination}",
+        'departure_date': departure_time.strftime('%Y-%m-%d %H:%M')
+    }
+
+
+class TicketCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.folder = None
+
+        self._app = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Pre-render queue, drained by one thread per worker process
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._worker = None
+        self._worker_pid = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('QR_CACHE_SIZE', self.max_entries)
+        self.folder = app.config.get('QR_CACHE_FOLDER') or os.path.join(app.config['UPLOAD_FOLDER'], 'tickets')
+
+        self._app = app
+        app.extensions['ticket_cache'] = self
+
+    def _path(self, qr_reference, info):
+        digest = hashlib.sha256(repr(sorted(info.items())).encode()).hexdigest()[:12]
+        # References are generated by us (UTK-<id>-<timestamp>-<hex>); keep file names safe regardless
+        name = ''.join(char for char in qr_reference if char.isalnum() or char == '-')
+        return os.path.join(self.folder, f'{name}-{digest}.png')
+
+    def get(self, qr_reference: str, info: dict) -> bytes:
+        """The PNG ticket for a QR reference, rendered only if it isn't cached yet."""
+        path = self._path(qr_reference, info)
+
+        with self._lock:
+            image = self._entries.get(path)
+            if image is not None:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return image
+
+        try:
+            with open(path, 'rb') as f:
+                image = f.read()
+            self.disk_hits += 1
+        except FileNotFoundError:
+            image = self._render(path, qr_reference, info)
+
+        with self._lock:
+            self._entries[path] = image
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return image
+
+    def _render(self, path, qr_reference, info):
+        from .qr_generator import generate_qr_code_image
+
+        image = generate_qr_code_image(qr_reference, info).getvalue()
+        self.renders += 1
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            # Write then rename, so other workers never read a partial file
+            temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(image)
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning(f"Could not store rendered ticket {path}: {e}")
+        return image
+
+    # Background pre-rendering
+
+    def prerender(self, booking_ids):
+        """Queue the tickets of (committed) bookings for rendering in the background."""
+        booking_ids = list(booking_ids)
+        if not booking_ids:
+            return
+        self._pending.append(booking_ids)
+        self._ensure_worker()
+        self._wake.set()
+
+    def prerender_now(self, booking_ids):
+        """Render the tickets of confirmed bookings that aren't cached yet. Needs an app context."""
+        from app import db
+        from app.models import Bookings, Schedules, Routes
+
+        rows = db.session.query(
+            Bookings.id, Bookings.qr_code_reference, Routes.origin, Routes.destination, Schedules.departure_time
+        ).join(Schedules, Schedules.id == Bookings.schedule_id).join(Routes, Routes.id == Schedules.route_id).filter(
+            Bookings.id.in_(booking_ids),
+            Bookings.status == 'confirmed',
+            Bookings.qr_code_reference.isnot(None)
+        ).all()
+
+        rendered = 0
+        for booking_id, qr_reference, origin, destination, departure_time in rows:
+            info = ticket_info(booking_id, origin, destination, departure_time)
+            path = self._path(qr_reference, info)
+            if not os.path.exists(path):
+                self._render(path, qr_reference, info)
+                rendered += 1
+        return rendered
+
+    def _ensure_worker(self):
+        # One thread per worker process; forked workers start their own
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='ticket-prerender', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            while self._pending:
+                booking_ids = self._pending.popleft()
+                try:
+                    with self._app.app_context():
+                        self.prerender_now(booking_ids)
+                except Exception:
+                    logger.exception('Ticket pre-render failed')
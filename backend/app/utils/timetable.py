@@ -0,0 +1,290 @@
+"""
+In-memory timetable of upcoming departures.
+
+Holds every schedule departing within the next TIMETABLE_HORIZON_HOURS for
+registered companies, indexed by departure time and by origin stop. It is
+loaded once, then kept current incrementally: committed Schedules changes
+mark their ids dirty and only those rows are re-read on the next access.
+Route, bus or company name/status changes (rare) trigger a full reload, as
+does reaching TIMETABLE_MAX_AGE, which also picks up changes made by other
+workers.
+
+Used by the connecting-journey search and the departure boards.
+"""
+
+import time
+import heapq
+import bisect
+import itertools
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+from .change_events import subscribe
+
+# Company columns the timetable holds or filters on
+_COMPANY_FIELDS = {'name', 'status'}
+
+
+def stop_key(name: str) -> str:
+    """Normalize a stop name for lookups."""
+    return ' '.join(name.split()).casefold()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes for timezone-aware columns
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class Departure:
+    """One scheduled departure (a timetable connection)."""
+
+    __slots__ = (
+        'schedule_id', 'route_id', 'origin', 'destination', 'origin_key', 'destination_key',
+        'departure_time', 'arrival_time', 'price', 'available_seats',
+        'bus_id', 'bus_number', 'company_id', 'company_name'
+    )
+
+    def __init__(self, row):
+        self.schedule_id = row.id
+        self.route_id = row.route_id
+        self.origin = row.origin
+        self.destination = row.destination
+        self.origin_key = stop_key(row.origin)
+        self.destination_key = stop_key(row.destination)
+        self.departure_time = _as_utc(row.departure_time)
+        self.arrival_time = _as_utc(row.arrival_time)
+        self.price = row.price
+        self.available_seats = row.available_seats
+        self.bus_id = row.bus_id
+        self.bus_number = row.bus_number
+        self.company_id = row.company_id
+        self.company_name = row.company_name
+
+    @property
+    def sort_key(self):
+        return (self.departure_time, self.schedule_id)
+
+    def to_dict(self):
+        return {
+            'schedule_id': self.schedule_id,
+            'origin': self.origin,
+            'destination': self.destination,
+            'departure_time': self.departure_time.isoformat(),
+            'arrival_time': self.arrival_time.isoformat(),
+            'price': self.price,
+            'available_seats': self.available_seats,
+            'bus': {
+                'id': self.bus_id,
+                'bus_number': self.bus_number
+            },
+            'company': {
+                'id': self.company_id,
+                'name': self.company_name
+            }
+        }
+
+
+class Timetable:
+    def __init__(self, horizon_hours: int = 168, max_age: int = 300):
+        self.horizon = timedelta(hours=horizon_hours)
+        self.max_age = max_age
+
+        self._by_id = {}
+        # Sorted (departure_time, schedule_id) keys, overall and per origin stop
+        self._keys = []
+        self._keys_by_origin = {}
+        # stop key -> display name
+        self._stops = {}
+
+        self._loaded_at = None
+        self._loaded_until = None
+        self._needs_reload = True
+        self._dirty_ids = set()
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        from app.models import Schedules, Routes, Buses, BusCompanies
+
+        self.horizon = timedelta(hours=app.config.get('TIMETABLE_HORIZON_HOURS', 168))
+        self.max_age = app.config.get('TIMETABLE_MAX_AGE', self.max_age)
+        app.extensions['timetable'] = self
+
+        subscribe(Schedules, self._on_schedule_changes)
+        subscribe(Routes, self._on_catalog_changes)
+        subscribe(Buses, self._on_catalog_changes)
+        subscribe(BusCompanies, self._on_company_changes)
+
+    # Change tracking
+
+    def _on_schedule_changes(self, changes):
+        with self._lock:
+            self._dirty_ids.update(change.id for change in changes if change.id is not None)
+
+    def _on_catalog_changes(self, changes):
+        with self._lock:
+            self._needs_reload = True
+
+    def _on_company_changes(self, changes):
+        # Balance updates (one per confirmed payment) leave the timetable as is
+        for change in changes:
+            if change.op != 'update' or _COMPANY_FIELDS & change.previous.keys():
+                self._on_catalog_changes(changes)
+                return
+
+    # Loading
+
+    def _query(self):
+        from app import db
+        from app.models import Schedules, Routes, Buses, BusCompanies
+
+        return db.session.query(
+            Schedules.id,
+            Schedules.route_id,
+            Schedules.departure_time,
+            Schedules.arrival_time,
+            Schedules.price,
+            Schedules.available_seats,
+            Routes.origin,
+            Routes.destination,
+            Buses.id.label('bus_id'),
+            Buses.bus_number,
+            BusCompanies.id.label('company_id'),
+            BusCompanies.name.label('company_name')
+        ).select_from(Schedules).join(Routes).join(Buses).join(BusCompanies).filter(
+            BusCompanies.status == 'registered'
+        )
+
+    def _reload(self, now):
+        from app.models import Schedules
+
+        until = now + self.horizon
+        rows = self._query().filter(
+            Schedules.departure_time > now,
+            Schedules.departure_time < until
+        ).order_by(Schedules.departure_time.asc(), Schedules.id.asc()).all()
+
+        self._by_id = {}
+        self._keys = []
+        self._keys_by_origin = {}
+        self._stops = {}
+        for row in rows:
+            departure = Departure(row)
+            self._by_id[departure.schedule_id] = departure
+            self._keys.append(departure.sort_key)
+            self._keys_by_origin.setdefault(departure.origin_key, []).append(departure.sort_key)
+            self._index_stops(departure)
+
+        self._loaded_at = time.monotonic()
+        self._loaded_until = until
+        self._needs_reload = False
+        self._dirty_ids.clear()
+
+    def _refresh(self, schedule_ids):
+        from app.models import Schedules
+
+        rows = self._query().filter(Schedules.id.in_(schedule_ids)).all()
+        for schedule_id in schedule_ids:
+            self._remove(schedule_id)
+        for row in rows:
+            departure = Departure(row)
+            if departure.departure_time < self._loaded_until:
+                self._insert(departure)
+
+    def _insert(self, departure):
+        self._by_id[departure.schedule_id] = departure
+        bisect.insort(self._keys, departure.sort_key)
+        bisect.insort(self._keys_by_origin.setdefault(departure.origin_key, []), departure.sort_key)
+        self._index_stops(departure)
+
+    def _remove(self, schedule_id):
+        departure = self._by_id.pop(schedule_id, None)
+        if departure is None:
+            return
+        for keys in (self._keys, self._keys_by_origin.get(departure.origin_key, [])):
+            index = bisect.bisect_left(keys, departure.sort_key)
+            if index < len(keys) and keys[index] == departure.sort_key:
+                del keys[index]
+
+    def _index_stops(self, departure):
+        self._stops.setdefault(departure.origin_key, departure.origin)
+        self._stops.setdefault(departure.destination_key, departure.destination)
+
+    def _ensure_fresh(self):
+        """Bring the timetable up to date. Must run inside an app context."""
+        now = datetime.now(timezone.utc)
+        expired = (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > self.max_age
+            # Keep at least half the horizon ahead of us
+            or self._loaded_until - now < self.horizon / 2
+        )
+        if self._needs_reload or expired:
+            self._reload(now)
+        elif self._dirty_ids:
+            dirty = list(self._dirty_ids)
+            self._dirty_ids.clear()
+            self._refresh(dirty)
+
+    # Reads
+
+    @contextmanager
+    def reading(self):
+        """
+        Hold the timetable steady for a read.
+
+        Yields a TimetableView over the live indexes; updates wait until the
+        block exits, so keep the work inside it short and don't keep the view.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            yield TimetableView(
+                self._by_id, self._keys, self._keys_by_origin, self._stops, self._loaded_until
+            )
+
+
+class TimetableView:
+    """Read-only view of the timetable, see Timetable.reading()."""
+
+    __slots__ = ('by_id', 'keys', 'keys_by_origin', 'stops', 'covers_until')
+
+    def __init__(self, by_id, keys, keys_by_origin, stops, covers_until):
+        self.by_id = by_id
+        self.keys = keys
+        self.keys_by_origin = keys_by_origin
+        self.stops = stops
+        self.covers_until = covers_until
+
+    def match_stops(self, text: str):
+        """Stop keys whose name contains text (case-insensitive)."""
+        needle = stop_key(text)
+        if needle in self.stops:
+            return {needle}
+        return {stop for stop in self.stops if needle in stop}
+
+    def departures(self, start: datetime, end: datetime):
+        """All departures in [start, end), in departure order."""
+        low = bisect.bisect_left(self.keys, (start,))
+        high = bisect.bisect_left(self.keys, (end,))
+        return [self.by_id[key[1]] for key in self.keys[low:high]]
+
+    def board(self, stops, start: datetime, end: datetime, limit: int):
+        """
+        Departure board: the next departures from any of stops in [start, end),
+        merged in departure order. O(log n + k) per stop.
+        """
+        slices = [self.departures_from(stop, start, end, limit) for stop in stops]
+        if len(slices) == 1:
+            return slices[0]
+        merged = heapq.merge(*slices, key=lambda departure: departure.sort_key)
+        return list(itertools.islice(merged, limit))
+
+    def departures_from(self, stop: str, start: datetime, end: datetime, limit: int = None):
+        """Departures from a stop key in [start, end), in departure order."""
+        keys = self.keys_by_origin.get(stop, [])
+        low = bisect.bisect_left(keys, (start,))
+        high = bisect.bisect_left(keys, (end,))
+        if limit is not None:
+            high = min(high, low + limit)
+        return [self.by_id[key[1]] for key in keys[low:high]]
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+"""
+Contention benchmark for the booking seat strategies.
+
+Fires N concurrent POST /api/bookings/book requests (one passenger each) at a
+single schedule with fewer seats than requests, once per strategy
+(BOOKING_SEAT_STRATEGY = inventory, counter, locked), and reports throughput, latency
+percentiles and oversell: bookings beyond the seats on sale, seats handed out
+twice, or a negative seat counter.
+
+The PayChangu call is replaced by a fake that sleeps --gateway-ms, so only
+our own database work is measured. The script creates its own company,
+passengers and schedules and removes them afterwards. Point it at a scratch
+database, ideally PostgreSQL (SQLite serializes all writers):
+
+    DEV_DATABASE_URL=postgresql://... python benchmark_booking.py --requests 200 --seats 150
+
+Run this from the backend folder.
+"""
+
+import time
+import uuid
+import argparse
+import threading
+from datetime import datetime, timezone, timedelta
+
+from app import create_app, db
+from app.models import Users, BusCompanies, Branches, Buses, Routes, Schedules, ScheduleSeats, Bookings
+from app.utils.seat_inventory import create_seats
+
+STRATEGIES = ('inventory', 'counter', 'locked')
+PASSWORD = 'benchmark'
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def create_fixtures(tag, passengers):
+    """Company, bus, route and passengers for one run. Returns (bus id, route id, passenger phone numbers)."""
+    owner = Users(name=f'bench-owner-{tag}', email=f'owner-{tag}@bench.local', phone_number=f'b{tag}o', role='company_owner')
+    owner.set_password(PASSWORD)
+    db.session.add(owner)
+    db.session.flush()
+
+    company = BusCompanies(
+        name=f'Benchmark {tag}', description='benchmark', contact_info={}, account_details={},
+        status='registered', owner_id=owner.id
+    )
+    db.session.add(company)
+    db.session.flush()
+    branch = Branches(name=f'bench-{tag}', company_id=company.id)
+    db.session.add(branch)
+    db.session.flush()
+    bus = Buses(name=f'bench-{tag}', bus_number=f'BENCH-{tag}', seating_capacity=1000, company_id=company.id, branch_id=branch.id)
+    route = Routes(origin=f'Bench A {tag}', destination=f'Bench B {tag}', distance=100)
+    db.session.add_all([bus, route])
+
+    phones = []
+    for number in range(passengers):
+        phone = f'b{tag}p{number}'
+        passenger = Users(name=f'bench-{number}', email=f'{phone}@bench.local', phone_number=phone, role='passenger')
+        passenger.set_password(PASSWORD)
+        db.session.add(passenger)
+        phones.append(phone)
+    db.session.commit()
+    return bus.id, route.id, phones
+
+
+def create_schedule(bus_id, route_id, seats, offset_days):
+    departure = datetime.now(timezone.utc) + timedelta(days=30 + offset_days)
+    schedule = Schedules(
+        departure_time=departure, arrival_time=departure + timedelta(hours=4),
+        route_id=route_id, bus_id=bus_id, price=10000, available_seats=seats
+    )
+    db.session.add(schedule)
+    db.session.flush()
+    create_seats(schedule.id, seats)
+    db.session.commit()
+    return schedule.id
+
+
+def run_strategy(app, strategy, schedule_id, phones, seats):
+    app.config['BOOKING_SEAT_STRATEGY'] = strategy
+
+    # Log everyone in up front so only booking is timed
+    clients = []
+    for phone in phones:
+        client = app.test_client()
+        response = client.post('/api/auth/login', json={'phone': phone, 'password': PASSWORD})
+        if response.status_code != 200:
+            raise SystemExit(f'Login failed for {phone}: {response.get_data(as_text=True)}')
+        clients.append(client)
+
+    latencies = []
+    statuses = []
+    lock = threading.Lock()
+    start = threading.Barrier(len(clients) + 1)
+
+    def book(client):
+        start.wait()
+        began = time.perf_counter()
+        response = client.post('/api/bookings/book', json={'schedule_id': schedule_id})
+        elapsed = time.perf_counter() - began
+        with lock:
+            latencies.append(elapsed)
+            statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=book, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+
+    with app.app_context():
+        booked = Bookings.query.filter(Bookings.schedule_id == schedule_id, Bookings.status != 'cancelled').count()
+        counter = db.session.get(Schedules, schedule_id).available_seats
+        numbered = [
+            seat for seat, in db.session.query(Bookings.seat_number).filter(
+                Bookings.schedule_id == schedule_id, Bookings.seat_number.isnot(None)
+            )
+        ]
+
+    return {
+        'strategy': strategy,
+        'requests': len(statuses),
+        'booked': statuses.count(201),
+        'rejected': sum(1 for status in statuses if 400 <= status < 500),
+        'errors': sum(1 for status in statuses if status >= 500),
+        'throughput': len(statuses) / wall if wall else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'oversold': max(0, booked - seats) + (len(numbered) - len(set(numbered))) + max(0, -counter),
+        'counter': counter
+    }
+
+
+def cleanup(tag, schedule_ids):
+    users = [user_id for user_id, in db.session.query(Users.id).filter(Users.email.like(f'%{tag}%@bench.local'))]
+    Bookings.query.filter(Bookings.schedule_id.in_(schedule_ids)).delete(synchronize_session=False)
+    ScheduleSeats.query.filter(ScheduleSeats.schedule_id.in_(schedule_ids)).delete(synchronize_session=False)
+    Schedules.query.filter(Schedules.id.in_(schedule_ids)).delete(synchronize_session=False)
+    company_ids = [company_id for company_id, in db.session.query(BusCompanies.id).filter(BusCompanies.owner_id.in_(users))]
+    Buses.query.filter(Buses.company_id.in_(company_ids)).delete(synchronize_session=False)
+    Branches.query.filter(Branches.company_id.in_(company_ids)).delete(synchronize_session=False)
+    BusCompanies.query.filter(BusCompanies.id.in_(company_ids)).delete(synchronize_session=False)
+    Routes.query.filter(Routes.origin == f'Bench A {tag}').delete(synchronize_session=False)
+    Users.query.filter(Users.id.in_(users)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=100, help='concurrent booking requests per strategy')
+    parser.add_argument('--seats', type=int, default=80, help='seats on sale on the schedule')
+    parser.add_argument('--gateway-ms', type=float, default=0, help='simulated payment gateway latency')
+    parser.add_argument('--strategy', choices=STRATEGIES, action='append', help='strategy to run (default: all)')
+    parser.add_argument('--env', default='development', help='config to load')
+    args = parser.parse_args()
+
+    app = create_app(args.env)
+
+    import app.blueprints.bookings as bookings
+
+    def fake_payment_link(booking_id, amount, user_email=None, user_name=None):
+        time.sleep(args.gateway_ms / 1000)
+        return {'status': 'success', 'checkout_url': f'https://bench.local/{booking_id}', 'tx_ref': f'BOOKING-{booking_id}-{uuid.uuid4().hex}'}
+
+    bookings.create_payment_link = fake_payment_link
+
+    tag = uuid.uuid4().hex[:8]
+    strategies = args.strategy or list(STRATEGIES)
+    schedule_ids = []
+    results = []
+    try:
+        with app.app_context():
+            bus_id, route_id, phones = create_fixtures(tag, args.requests)
+            for offset, _ in enumerate(strategies):
+                schedule_ids.append(create_schedule(bus_id, route_id, args.seats, offset))
+
+        for strategy, schedule_id in zip(strategies, schedule_ids):
+            results.append(run_strategy(app, strategy, schedule_id, phones, args.seats))
+    finally:
+        with app.app_context():
+            cleanup(tag, schedule_ids)
+
+    print(f"{args.requests} concurrent requests for {args.seats} seats, gateway {args.gateway_ms:g} ms, "
+          f"{app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0]}")
+    print(f"{'strategy':<10} {'booked':>7} {'rejected':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'oversold':>9}")
+    for result in results:
+        print(
+            f"{result['strategy']:<10} {result['booked']:>7} {result['rejected']:>9} {result['errors']:>7} "
+            f"{result['throughput']:>8.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['oversold']:>9}"
+        )
+
+
+if __name__ == '__main__':
+    main()
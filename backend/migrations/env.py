@@ -72,6 +72,10 @@ def run_migrations_offline():
         context.run_migrations()
 
 
+# Indexes the models only create on PostgreSQL
+POSTGRESQL_ONLY_INDEXES = {'ix_routes_origin_trgm', 'ix_routes_destination_trgm'}
+
+
 def run_migrations_online():
     """Run migrations in 'online' mode.
 
@@ -90,9 +94,24 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the SQLite FTS5 shadow tables are managed by hand in migrations and
+    # have no model, so keep autogenerate from trying to drop them
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == 'table' and reflected and name.startswith('routes_fts'):
+            return False
+        # Expression index managed by hand in its migration
+        if type_ == 'index' and reflected and name == 'ix_schedules_route_duration':
+            return False
+        # pg_trgm indexes only exist on PostgreSQL (ddl_if in the model)
+        if type_ == 'index' and name in POSTGRESQL_ONLY_INDEXES and context.get_context().dialect.name != 'postgresql':
+            return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -0,0 +1,44 @@
+"""seat holds
+
+Revision ID: 0a9e6c4d7b31
+Revises: f1c7d3b85a20
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime, timezone, timedelta
+from flask import current_app
+
+
+# revision identifiers, used by Alembic.
+revision = '0a9e6c4d7b31'
+down_revision = 'f1c7d3b85a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('schedule_seats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('held_until', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_schedule_seats_status_held_until', ['status', 'held_until'], unique=False)
+
+    # Seats of bookings still awaiting payment become holds, with a full
+    # payment window from now; the sweeper frees them if it runs out
+    bookings = sa.table('bookings', sa.column('id'), sa.column('status'))
+    seats = sa.table('schedule_seats', sa.column('booking_id'), sa.column('status'), sa.column('held_until'))
+    hold_until = datetime.now(timezone.utc) + timedelta(minutes=current_app.config.get('SEAT_HOLD_MINUTES', 15))
+    op.execute(
+        seats.update()
+        .where(
+            seats.c.booking_id.in_(sa.select(bookings.c.id).where(bookings.c.status == 'pending')),
+            seats.c.status.in_(['booked', 'held'])
+        )
+        .values(status='held', held_until=hold_until)
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('schedule_seats', schema=None) as batch_op:
+        batch_op.drop_index('ix_schedule_seats_status_held_until')
+        batch_op.drop_column('held_until')
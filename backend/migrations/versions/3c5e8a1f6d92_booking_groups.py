@@ -0,0 +1,28 @@
+"""booking groups
+
+Revision ID: 3c5e8a1f6d92
+Revises: 0a9e6c4d7b31
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c5e8a1f6d92'
+down_revision = '0a9e6c4d7b31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('group_reference', sa.String(length=40), nullable=True))
+        batch_op.create_index(batch_op.f('ix_bookings_group_reference'), ['group_reference'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_bookings_group_reference'))
+        batch_op.drop_column('group_reference')
@@ -0,0 +1,73 @@
+"""substring location index
+
+Revision ID: 7c1d2e9a4b10
+Revises: 4955ede7e0f7
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1d2e9a4b10'
+down_revision = '4955ede7e0f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index(
+            'ix_routes_origin_trgm', 'routes', ['origin'],
+            postgresql_using='gin', postgresql_ops={'origin': 'gin_trgm_ops'}
+        )
+        op.create_index(
+            'ix_routes_destination_trgm', 'routes', ['destination'],
+            postgresql_using='gin', postgresql_ops={'destination': 'gin_trgm_ops'}
+        )
+
+    elif dialect == 'sqlite':
+        # External-content FTS5 table: stores only the trigram index, the text
+        # itself is read from routes. Triggers keep it in sync.
+        op.execute(
+            "CREATE VIRTUAL TABLE routes_fts USING fts5("
+            "origin, destination, content='routes', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER routes_fts_ai AFTER INSERT ON routes BEGIN "
+            "INSERT INTO routes_fts(rowid, origin, destination) VALUES (new.id, new.origin, new.destination); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER routes_fts_ad AFTER DELETE ON routes BEGIN "
+            "INSERT INTO routes_fts(routes_fts, rowid, origin, destination) "
+            "VALUES ('delete', old.id, old.origin, old.destination); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER routes_fts_au AFTER UPDATE ON routes BEGIN "
+            "INSERT INTO routes_fts(routes_fts, rowid, origin, destination) "
+            "VALUES ('delete', old.id, old.origin, old.destination); "
+            "INSERT INTO routes_fts(rowid, origin, destination) VALUES (new.id, new.origin, new.destination); "
+            "END"
+        )
+        # Index any routes that already exist
+        op.execute("INSERT INTO routes_fts(routes_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_routes_destination_trgm', table_name='routes')
+        op.drop_index('ix_routes_origin_trgm', table_name='routes')
+
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS routes_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS routes_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS routes_fts_ai')
+        op.execute('DROP TABLE IF EXISTS routes_fts')
@@ -0,0 +1,37 @@
+"""integer trip duration index
+
+Revision ID: 9b4d1e7c2f05
+Revises: 6d2f9b7e4a18
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4d1e7c2f05'
+down_revision = '6d2f9b7e4a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Whole seconds instead of a julianday difference: equal durations compare
+    # equal, so the departure_time tie-break holds. Must match the SQLite
+    # expression in search._duration_expr
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP INDEX IF EXISTS ix_schedules_route_duration")
+        op.execute(
+            "CREATE INDEX ix_schedules_route_duration ON schedules "
+            "(route_id, CAST(strftime('%s', arrival_time) - strftime('%s', departure_time) AS INTEGER), departure_time)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP INDEX IF EXISTS ix_schedules_route_duration")
+        op.execute(
+            "CREATE INDEX ix_schedules_route_duration ON schedules "
+            "(route_id, ((julianday(arrival_time) - julianday(departure_time)) * 86400), departure_time)"
+        )
@@ -0,0 +1,26 @@
+"""schedules bus departure index
+
+Revision ID: a7e3c9d1f264
+Revises: 9b4d1e7c2f05
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e3c9d1f264'
+down_revision = '9b4d1e7c2f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('schedules', schema=None) as batch_op:
+        batch_op.create_index('ix_schedules_bus_departure', ['bus_id', 'departure_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('schedules', schema=None) as batch_op:
+        batch_op.drop_index('ix_schedules_bus_departure')
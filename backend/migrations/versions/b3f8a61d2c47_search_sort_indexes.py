@@ -0,0 +1,48 @@
+"""search sort indexes
+
+Revision ID: b3f8a61d2c47
+Revises: 7c1d2e9a4b10
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f8a61d2c47'
+down_revision = '7c1d2e9a4b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('schedules', schema=None) as batch_op:
+        batch_op.create_index('ix_schedules_route_price', ['route_id', 'price', 'departure_time'], unique=False)
+        batch_op.create_index('ix_schedules_route_seats', ['route_id', 'available_seats', 'departure_time'], unique=False)
+
+    # Trip duration in seconds; must match the expression in search._duration_expr
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_schedules_route_duration ON schedules "
+            "(route_id, (extract(epoch FROM arrival_time - departure_time)), departure_time)"
+        )
+
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE INDEX ix_schedules_route_duration ON schedules "
+            "(route_id, ((julianday(arrival_time) - julianday(departure_time)) * 86400), departure_time)"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        op.execute("DROP INDEX IF EXISTS ix_schedules_route_duration")
+
+    with op.batch_alter_table('schedules', schema=None) as batch_op:
+        batch_op.drop_index('ix_schedules_route_seats')
+        batch_op.drop_index('ix_schedules_route_price')
@@ -0,0 +1,40 @@
+"""search events
+
+Revision ID: d5a0c3e7f912
+Revises: b3f8a61d2c47
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a0c3e7f912'
+down_revision = 'b3f8a61d2c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('search_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('origin', sa.String(length=100), nullable=False),
+    sa.Column('destination', sa.String(length=100), nullable=False),
+    sa.Column('travel_date', sa.Date(), nullable=True),
+    sa.Column('sort', sa.String(length=20), nullable=True),
+    sa.Column('result_count', sa.Integer(), nullable=True),
+    sa.Column('searched_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('search_events', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_search_events_searched_at'), ['searched_at'], unique=False)
+        batch_op.create_index('ix_search_events_pair', ['origin', 'destination', 'searched_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('search_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_search_events_pair')
+        batch_op.drop_index(batch_op.f('ix_search_events_searched_at'))
+
+    op.drop_table('search_events')
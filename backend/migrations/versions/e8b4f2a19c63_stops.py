@@ -0,0 +1,31 @@
+"""stops
+
+Revision ID: e8b4f2a19c63
+Revises: d5a0c3e7f912
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b4f2a19c63'
+down_revision = 'd5a0c3e7f912'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stops',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('stops')
@@ -0,0 +1,110 @@
+"""schedule seats
+
+Revision ID: f1c7d3b85a20
+Revises: e8b4f2a19c63
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime, timezone
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7d3b85a20'
+down_revision = 'e8b4f2a19c63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('schedule_seats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('schedule_id', sa.Integer(), nullable=False),
+    sa.Column('seat_number', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['booking_id'], ['bookings.id'], ),
+    sa.ForeignKeyConstraint(['schedule_id'], ['schedules.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('schedule_id', 'seat_number', name='uq_schedule_seats_schedule_seat')
+    )
+    with op.batch_alter_table('schedule_seats', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_schedule_seats_booking_id'), ['booking_id'], unique=False)
+        batch_op.create_index('ix_schedule_seats_schedule_status', ['schedule_id', 'status'], unique=False)
+
+    # Inventory for schedules that haven't departed yet. Active bookings keep
+    # the seat number they already have (or get the first free one, written
+    # back to the booking); confirmed ones are booked, pending ones held until
+    # paid (0a9e6c4d7b31 gives those holds their expiry). The remaining
+    # available_seats are numbered around them.
+    connection = op.get_bind()
+    schedules = sa.table('schedules', sa.column('id'), sa.column('available_seats'), sa.column('departure_time'))
+    bookings = sa.table(
+        'bookings', sa.column('id'), sa.column('schedule_id'), sa.column('status'), sa.column('seat_number')
+    )
+    seats = sa.table(
+        'schedule_seats',
+        sa.column('schedule_id'), sa.column('seat_number'), sa.column('status'), sa.column('booking_id')
+    )
+
+    upcoming = connection.execute(
+        sa.select(schedules.c.id, schedules.c.available_seats)
+        .where(schedules.c.departure_time > datetime.now(timezone.utc))
+    ).all()
+    for schedule_id, available_seats in upcoming:
+        active = connection.execute(
+            sa.select(bookings.c.id, bookings.c.status, bookings.c.seat_number)
+            .where(bookings.c.schedule_id == schedule_id, bookings.c.status.in_(['pending', 'confirmed']))
+            .order_by(bookings.c.id)
+        ).all()
+
+        taken = set()
+        unnumbered = []
+        rows = []
+        for booking_id, status, seat_number in active:
+            seat_number = (seat_number or '').strip()
+            if not seat_number or seat_number in taken:
+                unnumbered.append((booking_id, status))
+                continue
+            taken.add(seat_number)
+            rows.append({
+                'schedule_id': schedule_id,
+                'seat_number': seat_number,
+                'status': 'booked' if status == 'confirmed' else 'held',
+                'booking_id': booking_id
+            })
+
+        def free_numbers():
+            number = 0
+            while True:
+                number += 1
+                if str(number) not in taken:
+                    yield str(number)
+
+        numbers = free_numbers()
+        for booking_id, status in unnumbered:
+            seat_number = next(numbers)
+            connection.execute(
+                bookings.update().where(bookings.c.id == booking_id).values(seat_number=seat_number)
+            )
+            rows.append({
+                'schedule_id': schedule_id,
+                'seat_number': seat_number,
+                'status': 'booked' if status == 'confirmed' else 'held',
+                'booking_id': booking_id
+            })
+        rows += [
+            {'schedule_id': schedule_id, 'seat_number': next(numbers), 'status': 'available', 'booking_id': None}
+            for _ in range(max(available_seats, 0))
+        ]
+        if rows:
+            op.bulk_insert(seats, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('schedule_seats', schema=None) as batch_op:
+        batch_op.drop_index('ix_schedule_seats_schedule_status')
+        batch_op.drop_index(batch_op.f('ix_schedule_seats_booking_id'))
+
+    op.drop_table('schedule_seats')
@@ -0,0 +1,115 @@
+import os
+import uuid
+import tempfile
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+# Config classes read the environment at import time: point the testing
+# config at a throwaway SQLite file unless TEST_DATABASE_URL says otherwise,
+# give ProductionConfig's import-time checks something to accept, and keep
+# the background sweeper and search telemetry out of the way
+os.environ.setdefault('TEST_DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault('DATABASE_URL', os.environ['TEST_DATABASE_URL'])
+os.environ.setdefault('SECRET_KEY', 'test-secret-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'test-jwt-secret-key')
+os.environ.setdefault('BOOKING_SWEEP_INTERVAL', '0')
+os.environ.setdefault('SEARCH_ANALYTICS_ENABLED', 'False')
+
+from sqlalchemy import event  # noqa: E402
+from flask_migrate import upgrade  # noqa: E402
+from app import create_app, db as _db  # noqa: E402
+from app.extensions import search_cache  # noqa: E402
+from app.models import Users, BusCompanies, Branches, Buses, Routes, Schedules  # noqa: E402
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        upgrade(directory=MIGRATIONS)
+    return app
+
+
+@pytest.fixture
+def db(app):
+    """The database session; everything a test writes is rolled back afterwards."""
+    # A fresh app context per test, so nothing cached on g (the logged-in user) leaks between tests
+    with app.app_context():
+        # Rolled back rows leave no change events behind, so start every test with an empty cache
+        search_cache.clear()
+        yield _db
+        _db.session.rollback()
+        _db.session.remove()
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """Log the test client in as a user (flushed, not necessarily committed)."""
+    def login_as(user):
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+        return client
+
+    return login_as
+
+
+@pytest.fixture
+def make_schedules(db):
+    """Create n upcoming schedules on a new route; returns (route, schedules)."""
+    def make(n, origin='Lilongwe', destination='Blantyre', start=None):
+        tag = uuid.uuid4().hex[:8]
+        owner = Users(name=f'owner {tag}', email=f'owner-{tag}@test.local', phone_number=f'test-{tag}', role='company_owner')
+        owner.set_password('password')
+        db.session.add(owner)
+        db.session.flush()
+
+        company = BusCompanies(
+            name=f'Company {tag}', description='test', contact_info={}, account_details={},
+            status='registered', owner_id=owner.id
+        )
+        db.session.add(company)
+        db.session.flush()
+        branch = Branches(name=f'branch {tag}', company_id=company.id)
+        db.session.add(branch)
+        db.session.flush()
+        bus = Buses(name=f'bus {tag}', bus_number=f'T-{tag}', seating_capacity=60, company_id=company.id, branch_id=branch.id)
+        route = Routes(origin=origin, destination=destination, distance=300)
+        db.session.add_all([bus, route])
+        db.session.flush()
+
+        # Hourly from 08:00 UTC, so a handful of departures share one local (UTC+2) day
+        start = start or datetime.now(timezone.utc).replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=3)
+        schedules = [
+            Schedules(
+                departure_time=start + timedelta(hours=i), arrival_time=start + timedelta(hours=i + 4),
+                route_id=route.id, bus_id=bus.id, price=10000 + i, available_seats=30
+            )
+            for i in range(n)
+        ]
+        db.session.add_all(schedules)
+        db.session.flush()
+        return route, schedules
+
+    return make
+
+
+@pytest.fixture
+def statements(db):
+    """(statement, parameters) of every SQL statement run during the test; clear() to start counting."""
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield recorded
+    event.remove(db.engine, 'before_cursor_execute', record)
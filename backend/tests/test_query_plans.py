@@ -0,0 +1,105 @@
+import pytest
+
+from app.models import Users
+from app.blueprints.search import ScheduleSearch, _schedule_search_query
+
+INDEX = 'ix_schedules_route_departure'
+
+# Each plan check runs against the database the suite is pointed at (TEST_DATABASE_URL);
+# the variant for the other dialect is skipped
+DIALECTS = ['sqlite', 'postgresql']
+
+
+@pytest.fixture(params=DIALECTS)
+def dialect(request, db):
+    if db.engine.dialect.name != request.param:
+        pytest.skip(f'needs TEST_DATABASE_URL to point at {request.param}')
+    return request.param
+
+
+@pytest.fixture
+def sqlite(db):
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip('EXPLAIN QUERY PLAN is SQLite specific')
+
+
+def query_plan(db, statement, parameters):
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # Test tables are tiny: make sure a usable index isn't passed over for a sequential scan
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        return [row[0] for row in connection.exec_driver_sql(f'EXPLAIN {statement}', parameters)]
+    return [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+
+def uses_index(plan, index):
+    return any(index in step for step in plan)
+
+
+def schedule_selects(statements):
+    return [(statement, parameters) for statement, parameters in statements if 'FROM schedules' in statement]
+
+
+def test_dated_schedule_search_uses_route_departure_index(db, dialect, make_schedules, statements):
+    route, schedules = make_schedules(3)
+    travel_date = schedules[0].departure_time.date()
+    statements.clear()
+
+    _schedule_search_query([route.id], ScheduleSearch(route.origin, route.destination, travel_date)).all()
+
+    [(statement, parameters)] = schedule_selects(statements)
+    plan = query_plan(db, statement, parameters)
+    assert uses_index(plan, INDEX), plan
+
+
+def test_get_schedules_uses_route_departure_index(db, dialect, client, make_schedules, statements):
+    route, schedules = make_schedules(3)
+    day = schedules[0].departure_time.date().isoformat()
+    statements.clear()
+
+    response = client.get(f'/api/schedules/get?route_id={route.id}&from_date={day}&to_date={day}')
+    assert response.status_code == 200
+
+    statement, parameters = schedule_selects(statements)[0]
+    plan = query_plan(db, statement, parameters)
+    assert uses_index(plan, INDEX), plan
+
+
+def test_company_schedules_date_filter_uses_departure_index(db, dialect, login, make_schedules, statements):
+    route, schedules = make_schedules(3)
+    manager = Users(
+        name='manager', email=f'manager-{route.id}@test.local', phone_number=f'manager-{route.id}',
+        role='schedule_manager', company_id=schedules[0].bus.company_id
+    )
+    manager.set_password('password')
+    db.session.add(manager)
+    db.session.flush()
+    day = schedules[0].departure_time.date().isoformat()
+    client = login(manager)
+    statements.clear()
+
+    response = client.get(f'/api/schedules/company/schedules?from_date={day}&to_date={day}')
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 3
+
+    [(statement, parameters)] = [
+        (statement, parameters) for statement, parameters in schedule_selects(statements)
+        if 'departure_time >=' in statement
+    ]
+    plan = query_plan(db, statement, parameters)
+    # The local-day range is a range scan per bus, not a filter over all the company's schedules
+    assert uses_index(plan, 'ix_schedules_bus_departure'), plan
+
+
+def test_fastest_sort_reads_the_duration_index_in_order(db, sqlite, make_schedules, statements):
+    route, schedules = make_schedules(5)
+    statements.clear()
+
+    rows = _schedule_search_query([route.id], ScheduleSearch(route.origin, route.destination, sort='fastest')).all()
+
+    [(statement, parameters)] = schedule_selects(statements)
+    plan = query_plan(db, statement, parameters)
+    assert uses_index(plan, 'ix_schedules_route_duration'), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+    # Equal durations fall back to departure order
+    assert [row.id for row in rows] == [schedule.id for schedule in schedules]
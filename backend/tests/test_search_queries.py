@@ -0,0 +1,39 @@
+import pytest
+from datetime import datetime, timezone, timedelta
+
+from app.extensions import catalog
+
+
+@pytest.mark.parametrize('matching', [0, 3, 9])
+def test_schedule_search_runs_a_constant_number_of_queries(client, make_schedules, statements, matching):
+    route, schedules = make_schedules(matching, origin='Mangochi', destination='Karonga')
+    # The first search in the process also probes the schema once (the SQLite FTS table): not per request
+    client.get('/api/search/schedules?origin=Dedza&destination=Salima')
+    statements.clear()
+
+    response = client.get('/api/search/schedules?origin=Mangochi&destination=Karonga')
+
+    assert response.status_code == 200
+    results = response.get_json()['schedules']
+    assert [result['schedule_id'] for result in results] == [schedule.id for schedule in schedules]
+    # Route ids for the origin/destination text, then one SELECT for the schedules with
+    # their route, bus and company: no per-row lazy loads
+    assert len(statements) == 2, [statement for statement, _ in statements]
+
+
+def test_round_trip_search_is_one_round_trip(client, make_schedules, statements):
+    start = datetime.now(timezone.utc).replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=3)
+    _, outbound = make_schedules(2, origin='Nkhotakota', destination='Chitipa', start=start)
+    _, inbound = make_schedules(3, origin='Chitipa', destination='Nkhotakota', start=start + timedelta(hours=3))
+    # Routes are matched on the catalog snapshot; the new routes are only flushed, so no change event marks it stale
+    catalog.rebuild()
+    statements.clear()
+
+    response = client.get('/api/search/round-trip?origin=Nkhotakota&destination=Chitipa')
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert [row['schedule_id'] for row in result['outbound']['schedules']] == [schedule.id for schedule in outbound]
+    # The first return leaves at 11:00, before the earliest outbound arrival (12:00)
+    assert [row['schedule_id'] for row in result['return']['schedules']] == [schedule.id for schedule in inbound[1:]]
+    assert len(statements) == 1, [statement for statement, _ in statements]